@@ -0,0 +1,248 @@
+import argparse
+import importlib
+import numpy as np
+import pandas as pd
+from backtest.sweep import STRATEGIES
+from services.instrumentation import instrumented_run, timed
+
+
+TRADING_DAYS = 252
+
+
+# ======================================
+# POSITION MATRICES
+# ======================================
+#
+# Built from run_portfolio's trade_log after the run, so the row loop
+# stays as it is. A position entered on day e and exited on day x is
+# held at the close of days e..x-1: each per-position weight is added at
+# row e, removed at row x, and a cumsum down the dates gives the
+# (dates x symbols) holdings.
+#
+# A float cumsum can leave a residue like 3e-15 after a same-day exit
+# and re-entry, so whether a cell is held comes from an integer count
+# of open positions, never from qty != 0.
+
+def _held(trade_log, shape, weight, dtype=float):
+
+    diff = np.zeros((shape[0] + 1, shape[1]), dtype=dtype)
+
+    entry = np.array([t["entry_date"] for t in trade_log], dtype=np.int64)
+    exit_ = np.array([shape[0] if t["exit_day"] is None else t["exit_day"] for t in trade_log], dtype=np.int64)
+    symbol = np.array([t["symbol"] for t in trade_log], dtype=np.int64)
+    w = np.array([weight(t) for t in trade_log], dtype=dtype)
+
+    np.add.at(diff, (entry, symbol), w)
+    np.add.at(diff, (exit_, symbol), -w)
+
+    return np.cumsum(diff[:-1], axis=0)
+
+
+def _last_close(panel, n_days):
+
+    # Forward-filled close, so positions are marked through missing bars
+    valid = panel["valid"][:n_days]
+    rows = np.where(valid, np.arange(n_days)[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+
+    return panel["close"][:n_days][rows, np.arange(valid.shape[1])]
+
+
+def position_matrices(panel, trade_log, n_days=None):
+
+    n_days = len(panel.dates) if n_days is None else n_days
+    shape = (n_days, len(panel.symbols))
+
+    closed = [t for t in trade_log if t["exit_day"] is not None]
+
+    realized = np.zeros((shape[0] + 1, shape[1]))
+    if closed:
+        np.add.at(
+            realized,
+            (np.array([t["exit_day"] for t in closed]), np.array([t["symbol"] for t in closed])),
+            np.array([t["pnl"] for t in closed])
+        )
+
+    if not trade_log:
+        zeros = np.zeros(shape)
+        return {"open": np.zeros(shape, dtype=np.int64), "qty": zeros, "value": zeros, "cost": zeros,
+                "stop_value": zeros, "realized": np.cumsum(realized[:-1], axis=0)}
+
+    open_ = _held(trade_log, shape, lambda t: 1, dtype=np.int64)
+    held = open_ > 0
+
+    qty = np.where(held, _held(trade_log, shape, lambda t: t["qty"]), 0)
+    close = _last_close(panel, n_days)
+
+    return {
+        "open": open_,
+        "qty": qty,
+        "value": np.where(held, qty * close, 0),
+        "cost": np.where(held, _held(trade_log, shape, lambda t: t["qty"] * t["entry"]), 0),
+        "stop_value": np.where(held, _held(trade_log, shape, lambda t: t["qty"] * t["stop"]), 0),
+        "realized": np.cumsum(realized[:-1], axis=0),
+    }
+
+
+# ======================================
+# DAILY MARK-TO-MARKET
+# ======================================
+
+def daily_analytics(panel, trade_log, initial_capital, n_days=None):
+
+    m = position_matrices(panel, trade_log, n_days)
+
+    unrealized = m["value"] - m["cost"]
+    symbol_pnl = m["realized"] + unrealized
+    open_risk = np.maximum(m["value"] - m["stop_value"], 0)
+
+    daily = pd.DataFrame({
+        "equity": initial_capital + symbol_pnl.sum(axis=1),
+        "realized_equity": initial_capital + m["realized"].sum(axis=1),
+        "gross_exposure": m["value"].sum(axis=1),
+        "open_risk": open_risk.sum(axis=1),
+        "positions": m["open"].sum(axis=1),
+    }, index=panel.dates[:len(symbol_pnl)])
+
+    symbol_pnl = pd.Series(symbol_pnl[-1], index=panel.symbols) if len(symbol_pnl) else pd.Series(dtype=float)
+
+    return daily, symbol_pnl[symbol_pnl != 0].sort_values(ascending=False)
+
+
+# Open positions are marked at the last close, pnl and R included
+def trade_table(panel, trade_log, n_days=None):
+
+    n_days = len(panel.dates) if n_days is None else n_days
+
+    if not trade_log:
+        return pd.DataFrame(columns=[
+            "symbol", "entry_date", "exit_date", "entry", "exit", "stop", "qty",
+            "pnl", "R", "holding_days", "open"
+        ])
+
+    trades = pd.DataFrame(trade_log)
+    is_open = trades["exit_day"].isna().to_numpy()
+
+    entry_day = trades["entry_date"].to_numpy(dtype=np.int64)
+    exit_day = np.where(is_open, n_days - 1, trades["exit_day"].fillna(0).to_numpy()).astype(np.int64)
+    symbol = trades["symbol"].to_numpy(dtype=np.int64)
+
+    last = _last_close(panel, n_days)[n_days - 1, symbol]
+    pnl = np.where(is_open, (last - trades["entry"]) * trades["qty"], trades["pnl"])
+
+    return pd.DataFrame({
+        "symbol": np.asarray(panel.symbols, dtype=object)[symbol],
+        "entry_date": panel.dates[entry_day],
+        "exit_date": pd.DatetimeIndex(panel.dates[exit_day]).where(~is_open),
+        "entry": trades["entry"],
+        "exit": trades["exit"],
+        "stop": trades["stop"],
+        "qty": trades["qty"],
+        "pnl": pnl,
+        "R": np.where(is_open, pnl / trades["risk_amount"], trades["R"]),
+        "holding_days": exit_day - entry_day,
+        "open": is_open,
+    }).sort_values(["entry_date", "symbol"], kind="stable", ignore_index=True)
+
+
+# ======================================
+# REPORT
+# ======================================
+
+def summarize_daily(daily, trades, initial_capital):
+
+    equity = daily["equity"].to_numpy()
+    returns = np.diff(equity, prepend=initial_capital) / np.concatenate([[initial_capital], equity[:-1]])
+
+    years = (daily.index[-1] - daily.index[0]).days / 365.25 if len(daily) > 1 else 0
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2)) if len(returns) else 0
+    volatility = returns.std(ddof=1) if len(returns) > 1 else 0
+
+    def drawdown(curve):
+        peak = np.maximum(np.maximum.accumulate(curve), initial_capital)
+        return (curve / peak - 1).min() * 100 if len(curve) else np.nan
+
+    closed = trades[~trades["open"]]
+
+    return {
+        "final_equity": equity[-1] if len(equity) else initial_capital,
+        "cagr": ((equity[-1] / initial_capital) ** (1 / years) - 1) * 100 if years > 0 else np.nan,
+        "sharpe": returns.mean() / volatility * np.sqrt(TRADING_DAYS) if volatility else np.nan,
+        "sortino": returns.mean() / downside * np.sqrt(TRADING_DAYS) if downside else np.nan,
+        "max_drawdown": drawdown(equity),
+        "max_drawdown_realized": drawdown(daily["realized_equity"].to_numpy()),
+        "exposure_pct": (daily["gross_exposure"] / daily["equity"]).mean() * 100,
+        "time_in_market_pct": (daily["positions"] > 0).mean() * 100,
+        "avg_open_risk_pct": (daily["open_risk"] / daily["equity"]).mean() * 100,
+        "avg_holding_days": closed["holding_days"].mean() if len(closed) else np.nan,
+        "open_positions": int(trades["open"].sum()),
+    }
+
+
+@timed("backtest.analytics")
+def analyze(panel, trade_log, equity_curve, initial_capital):
+
+    # stop_on_ruin runs can end before the panel does
+    n_days = len(equity_curve)
+
+    daily, symbol_pnl = daily_analytics(panel, trade_log, initial_capital, n_days)
+    trades = trade_table(panel, trade_log, n_days)
+
+    return {
+        "daily": daily,
+        "trades": trades,
+        "symbol_pnl": symbol_pnl,
+        "summary": summarize_daily(daily, trades, initial_capital),
+    }
+
+
+def print_analytics(report, top=10):
+
+    summary = report["summary"]
+
+    print("\n===== MARK-TO-MARKET =====")
+    print("Final Equity:", round(summary["final_equity"], 2))
+    print("CAGR %:", round(summary["cagr"], 2))
+    print("Sharpe:", round(summary["sharpe"], 2))
+    print("Sortino:", round(summary["sortino"], 2))
+    print("Max Drawdown % (MTM):", round(summary["max_drawdown"], 2))
+    print("Max Drawdown % (closed trades):", round(summary["max_drawdown_realized"], 2))
+    print("Exposure %:", round(summary["exposure_pct"], 2))
+    print("Time in Market %:", round(summary["time_in_market_pct"], 2))
+    print("Avg Open Risk %:", round(summary["avg_open_risk_pct"], 2))
+    print("Avg Holding (sessions):", round(summary["avg_holding_days"], 1))
+    print("Open Positions:", summary["open_positions"])
+
+    pnl = report["symbol_pnl"]
+    print(f"\n--- TOP {top} SYMBOLS ---")
+    print(pnl.head(top).round(2).to_string())
+    print(f"\n--- BOTTOM {top} SYMBOLS ---")
+    print(pnl.tail(top).round(2).to_string())
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Mark-to-market analytics for a portfolio backtest")
+    parser.add_argument("strategy", choices=sorted(STRATEGIES))
+    parser.add_argument("--trades", default=None, help="CSV file for the trade log")
+    parser.add_argument("--daily", default=None, help="CSV file for daily equity, exposure and open risk")
+    args = parser.parse_args()
+
+    module = importlib.import_module(STRATEGIES[args.strategy])
+
+    with instrumented_run(f"analytics-{args.strategy}"):
+        master = module.prepare_master()
+        trade_log = []
+        final_capital, trades, equity_curve = module.run_backtest(master, trade_log=trade_log)
+        report = analyze(master, trade_log, equity_curve, module.INITIAL_CAPITAL)
+
+    module.print_results(final_capital, trades, equity_curve)
+    print_analytics(report)
+
+    if args.trades:
+        report["trades"].to_csv(args.trades, index=False)
+        print("\nSaved:", args.trades)
+
+    if args.daily:
+        report["daily"].to_csv(args.daily)
+        print("Saved:", args.daily)
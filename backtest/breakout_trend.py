@@ -1,9 +1,14 @@
 import pandas as pd
 import numpy as np
+from backtest.engine import run_portfolio
+from backtest.metrics import summarize_results
 from services.upstox_data import load_stock_data
 from services.instrument_mapper import get_instrument_key
 from services.instrument_mapper import get_symbol_list
-from services.db_data_loader import load_stock_data as load_db_stock_data
+from services.price_cache import load_cached_panel
+from services.price_panel import PricePanel
+from services.indicators import add_indicators, add_panel_indicators
+from services.instrumentation import instrumented_run, timed
 
 
 SYMBOLS = get_symbol_list()
@@ -11,77 +16,130 @@ INITIAL_CAPITAL = 100000
 RISK_PER_TRADE = 0.01
 MAX_PORTFOLIO_RISK = 0.05
 
+# Tunable knobs, overridden per combination by backtest.sweep
+DEFAULT_PARAMS = {
+    "rsi_threshold": 55,  # Tune: 55 for stricter (lower DD, fewer trades), 45 for looser
+    "max_portfolio_risk": MAX_PORTFOLIO_RISK,
+    "breakout_buffer": 1.005,
+    "volume_multiplier": 1.5,
+    "max_stop_pct": 0.05,
+}
+
 START_DATE = "2015-01-01"
 END_DATE = "2026-02-13"
 
+BREAKOUT_INDICATORS = ["ema_200", "hh_20", "ll_10", "ll_7", "vol_ma_20", "rsi"]
+
+# Only compared against, never traded at (ll_10 sets the stop price), so
+# prepare_master can hold them in float32
+COMPARE_ONLY_FIELDS = ["ema_200", "hh_20", "ll_7", "vol_ma_20", "rsi"]
+
 
 # ======================================
 # PREPARE MASTER DATA
 # ======================================
-def calculate_rsi(df, period=14):
-    delta = df['close'].diff()
-    up = delta.clip(lower=0)
-    down = -delta.clip(upper=0)
-    ema_up = up.ewm(com=period - 1, adjust=False).mean()
-    ema_down = down.ewm(com=period - 1, adjust=False).mean()
-    rs = ema_up / ema_down
-    df['rsi'] = 100 - 100 / (1 + rs)
-    return df
-
-def prepare_master():
-    frames = []
+@timed("backtest.breakout_prepare_master")
+def prepare_master(symbols=None, nifty_df=None, indicator_dtype=np.float64):
+
+    if symbols is None:
+        symbols = SYMBOLS
+    symbols = list(dict.fromkeys(symbols))
 
     # ----- Load Nifty -----
-    nifty_key = "NSE_INDEX|Nifty 50"
-    nifty_df = load_stock_data(nifty_key, START_DATE, END_DATE)
+    if nifty_df is None:
+        nifty_key = "NSE_INDEX|Nifty 50"
+        nifty_df = load_stock_data(nifty_key, START_DATE, END_DATE)
 
-    nifty_df["ema_200"] = nifty_df["close"].ewm(span=200).mean()
-    nifty_df["ema_50"] = nifty_df["close"].ewm(span=50).mean()
+    add_indicators(nifty_df, ["ema_200", "ema_50"])
     nifty_df["market_ok"] = (nifty_df["close"] > nifty_df["ema_200"]) & (nifty_df["ema_50"] > nifty_df["ema_200"]) & (nifty_df["ema_200"] > nifty_df["ema_200"].shift(20))  # Slope check: EMA200 rising over last 20 days
     # nifty_df["market_ok"] = nifty_df["close"] > nifty_df["ema_200"]
 
     # ----- Load Stocks -----
-    for symbol in SYMBOLS:
-        # instrument_key = get_instrument_key(symbol)
+    panel = load_cached_panel(symbols, START_DATE, END_DATE, min_bars=300)
+
+    add_panel_indicators(panel, BREAKOUT_INDICATORS)
+    panel.cast(COMPARE_ONLY_FIELDS, indicator_dtype)
+
+    # Nifty regime per date, NaN where Nifty has no bar; one row shared by every symbol
+    market_ok = nifty_df["market_ok"].reindex(panel.dates).to_numpy(dtype=float)
+    panel["market_ok"] = np.broadcast_to(market_ok[:, None], panel.shape)
+
+    return panel
+
+
+# ======================================
+# ENTRY / EXIT SIGNALS
+# ======================================
 
-        # if instrument_key is None:
-        #     continue
+def build_signals(panel, params=None):
 
-        df = load_db_stock_data(symbol, START_DATE, END_DATE)
-        if df is None or len(df) < 300:
-            continue
+    params = {**DEFAULT_PARAMS, **(params or {})}
 
-        df["ema_200"] = df["close"].ewm(span=200).mean()
-        df["hh_20"] = df["high"].rolling(20).max().shift(1)
-        df["ll_10"] = df["low"].rolling(10).min().shift(1)
-        df["ll_7"] = df["low"].rolling(7).min().shift(1)
-        df["vol_ma_20"] = df["volume"].rolling(20).mean()
-        df = calculate_rsi(df, period=14)
-        df["symbol"] = symbol
+    close = panel["close"]
+    rsi = panel["rsi"]
+    ll_10 = panel["ll_10"]
 
-        # Merge Nifty regime
-        df = df.merge(
-            nifty_df[["market_ok"]],
-            left_index=True,
-            right_index=True,
-            how="left"
-        )
+    # NaN thresholds never reject a row, same as the scalar comparisons
+    # in run_backtest_legacy
+    gate = ~np.isnan(rsi) & ~(rsi < params["rsi_threshold"]) & (panel["market_ok"] != 0)
 
-        frames.append(df)
+    raw_stop_distance = close - ll_10
+    max_stop_distance = close * params["max_stop_pct"]
+    stop_distance = np.where(max_stop_distance < raw_stop_distance, max_stop_distance, raw_stop_distance)
 
-    master = pd.concat(frames)
-    master.sort_index(inplace=True)
+    entry_ok = (
+        ~(close <= panel["ema_200"]) &
+        ~(close <= panel["hh_20"] * params["breakout_buffer"]) &
+        ~(panel["volume"] <= params["volume_multiplier"] * panel["vol_ma_20"]) &
+        ~np.isnan(ll_10) &
+        (stop_distance > 0)
+    )
 
-    return master
+    signals = panel.select(["low", "high", "close"])
+
+    signals["gate"] = gate
+    signals["entry_ok"] = entry_ok
+    signals["entry_price"] = close
+    signals["stop"] = close - stop_distance
+    signals["risk"] = stop_distance
+    signals["target"] = np.broadcast_to(np.inf, panel.shape)
+    signals["exit_signal"] = close < panel["ll_7"]
+
+    return signals
 
 
 # ======================================
 # BACKTEST ENGINE
 # ======================================
 
-def run_backtest():
+def run_backtest(master=None, params=None, initial_capital=INITIAL_CAPITAL, trade_log=None,
+                 close_open=False):
+
+    if master is None:
+        master = prepare_master()
+
+    params = {**DEFAULT_PARAMS, **(params or {})}
+
+    return run_portfolio(
+        build_signals(master, params),
+        initial_capital,
+        RISK_PER_TRADE,
+        params["max_portfolio_risk"],
+        r_basis="position",
+        trade_log=trade_log,
+        close_open=close_open
+    )
 
-    master = prepare_master()
+
+@timed("backtest.breakout_legacy")
+def run_backtest_legacy(master=None):
+
+    if master is None:
+        master = prepare_master()
+
+    # Reference loop over the long date-sorted frame
+    if isinstance(master, PricePanel):
+        master = master.to_frame()
 
     capital = INITIAL_CAPITAL
     equity_curve = []
@@ -207,30 +265,23 @@ def run_backtest():
 
 def print_results(final_capital, trades, equity_curve):
 
-    trades = np.array(trades)
+    summary = summarize_results(final_capital, trades, equity_curve, INITIAL_CAPITAL)
 
-    if len(trades) == 0:
+    if summary["trades"] == 0:
         print("No trades.")
         return
 
-    win_rate = np.mean(trades > 0)
-    profit_factor = abs(trades[trades > 0].sum() / trades[trades < 0].sum())
-    total_return = (final_capital / INITIAL_CAPITAL - 1) * 100
-
-    eq = pd.Series(equity_curve)
-    dd = (eq - eq.cummax()) / eq.cummax()
-    max_drawdown = dd.min() * 100
-
     print("\n===== BREAKOUT PORTFOLIO (UPSTOX DATA) =====")
-    print("Trades:", len(trades))
+    print("Trades:", summary["trades"])
     print("Final Capital: ", final_capital)
-    print("Win Rate:", round(win_rate, 2))
-    print("Profit Factor:", round(profit_factor, 2))
-    print("Total Return %:", round(total_return, 2))
-    print("Max Drawdown %:", round(max_drawdown, 2))
+    print("Win Rate:", round(summary["win_rate"], 2))
+    print("Profit Factor:", round(summary["profit_factor"], 2))
+    print("Total Return %:", round(summary["total_return"], 2))
+    print("Max Drawdown %:", round(summary["max_drawdown"], 2))
 
 
 if __name__ == "__main__":
 
-    final_capital, trades, equity_curve = run_backtest()
+    with instrumented_run("backtest-breakout"):
+        final_capital, trades, equity_curve = run_backtest()
     print_results(final_capital, trades, equity_curve)
@@ -0,0 +1,153 @@
+import numpy as np
+from services.instrumentation import count, timed
+
+
+# ======================================
+# PORTFOLIO LOOP OVER INTEGER INDICES
+# ======================================
+#
+# Required PricePanel fields (dates x symbols):
+#   valid        - a bar exists for the symbol on that date
+#   low, high, close
+#   gate         - row reaches the portfolio risk cap check
+#   entry_ok     - row passes every remaining entry filter
+#   entry_price, stop, risk, target
+#   exit_signal  - close-based exit, filled at the close
+#
+# Checks run in the same order as the original per-date loops:
+# stop first, then target, then the exit signal; entries are taken in
+# symbol order and stop at the first gated row once the risk cap is hit.
+#
+# Pass a list as trade_log to get one dict per position (day and symbol
+# indices into the panel); positions still open at the end have
+# exit_day None. backtest.analytics builds the mark-to-market views
+# from it.
+#
+# close_open=True instead settles positions still open at the end at
+# their last close (on the last day), so a slice of history is scored
+# with its open trades marked rather than dropped.
+
+def _realize(pos, exit_price, r_basis):
+
+    pnl = (exit_price - pos["entry"]) * pos["qty"]
+
+    if r_basis == "position":
+        R = pnl / (pos["risk"] * pos["qty"])
+    else:
+        R = pnl / pos["risk_amount"]
+
+    return pnl, R
+
+
+@timed("backtest.run_portfolio")
+def run_portfolio(panel, initial_capital, risk_per_trade, max_portfolio_risk,
+                  r_basis="risk_amount", stop_on_ruin=False, trade_log=None, close_open=False):
+
+    valid = panel["valid"]
+    low = panel["low"]
+    high = panel["high"]
+    close = panel["close"]
+    exit_signal = panel["exit_signal"]
+    entry_ok = panel["entry_ok"]
+    entry_price = panel["entry_price"]
+    stop_price = panel["stop"]
+    risk_price = panel["risk"]
+    target_price = panel["target"]
+
+    candidates = panel["gate"] & valid
+
+    capital = initial_capital
+    equity_curve = []
+    trades = []
+    open_positions = {}
+
+    for d in range(valid.shape[0]):
+
+        # --------- EXIT ---------
+        for s in list(open_positions):
+
+            if not valid[d, s]:
+                continue
+
+            pos = open_positions[s]
+            exit_price = None
+
+            if low[d, s] <= pos["stop"]:
+                exit_price = pos["stop"]
+
+            elif high[d, s] >= pos["target"]:
+                exit_price = pos["target"]
+
+            elif exit_signal[d, s]:
+                exit_price = close[d, s]
+
+            if exit_price is not None:
+                pnl, R = _realize(pos, exit_price, r_basis)
+                capital += pnl
+                trades.append(R)
+
+                if trade_log is not None:
+                    trade_log.append({**pos, "symbol": s, "exit_day": d, "exit": exit_price, "pnl": pnl, "R": R})
+
+                del open_positions[s]
+
+        # --------- ENTRY ---------
+        current_risk = sum(pos["risk_amount"] for pos in open_positions.values())
+
+        for s in np.flatnonzero(candidates[d]).tolist():
+
+            if s in open_positions:
+                continue
+
+            if current_risk >= capital * max_portfolio_risk:
+                break
+
+            if not entry_ok[d, s]:
+                continue
+
+            risk = risk_price[d, s]
+            risk_amount = capital * risk_per_trade
+            qty = risk_amount / risk
+
+            open_positions[s] = {
+                "entry": entry_price[d, s],
+                "stop": stop_price[d, s],
+                "target": target_price[d, s],
+                "qty": qty,
+                "risk_amount": risk_amount,
+                "risk": risk,
+                "entry_date": d
+            }
+
+            current_risk += risk_amount
+
+        equity_curve.append(capital)
+
+        if stop_on_ruin and capital <= 0:
+            break
+
+    if close_open and equity_curve:
+
+        d = len(equity_curve) - 1
+
+        for s, pos in list(open_positions.items()):
+
+            exit_price = close[np.flatnonzero(valid[:d + 1, s])[-1], s]
+            pnl, R = _realize(pos, exit_price, r_basis)
+            capital += pnl
+            trades.append(R)
+
+            if trade_log is not None:
+                trade_log.append({**pos, "symbol": s, "exit_day": d, "exit": exit_price, "pnl": pnl, "R": R})
+
+            del open_positions[s]
+
+        equity_curve[-1] = capital
+
+    if trade_log is not None:
+        for s, pos in open_positions.items():
+            trade_log.append({**pos, "symbol": s, "exit_day": None, "exit": np.nan, "pnl": np.nan, "R": np.nan})
+
+    count("backtest.days", len(equity_curve))
+
+    return capital, trades, equity_curve
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+
+# ======================================
+# SUMMARY STATISTICS
+# ======================================
+
+def summarize_results(final_capital, trades, equity_curve, initial_capital):
+
+    trades = np.array(trades)
+
+    summary = {
+        "trades": len(trades),
+        "final_capital": final_capital,
+        "win_rate": np.nan,
+        "profit_factor": np.nan,
+        "total_return": (final_capital / initial_capital - 1) * 100,
+        "max_drawdown": np.nan,
+    }
+
+    if len(trades) == 0:
+        return summary
+
+    gross_loss = trades[trades < 0].sum()
+
+    summary["win_rate"] = np.mean(trades > 0)
+    summary["profit_factor"] = abs(trades[trades > 0].sum() / gross_loss) if gross_loss else np.inf
+
+    eq = pd.Series(equity_curve)
+    dd = (eq - eq.cummax()) / eq.cummax()
+    summary["max_drawdown"] = dd.min() * 100
+
+    return summary
@@ -0,0 +1,273 @@
+import argparse
+import importlib
+import numpy as np
+import pandas as pd
+from backtest.sweep import STRATEGIES
+from services.instrumentation import instrumented_run, timed
+
+
+N_PATHS = 100000
+BATCH_ELEMENTS = 262144     # paths x steps per batch, keeps the float32 buffers near L2 size
+SCAN_BLOCK = 32             # steps per block in the blocked scans
+PERCENTILES = [5, 25, 50, 75, 95]
+METHODS = ["bootstrap", "shuffle"]
+
+
+# ======================================
+# BATCH LAYOUT
+# ======================================
+#
+# A batch holds log growth, log(1 + return), as float32 in a
+# (SCAN_BLOCK, blocks, paths) array: step t of a path sits at
+# [t % SCAN_BLOCK, t // SCAN_BLOCK]. Paths are the last axis, so every
+# operation runs along long contiguous rows.
+#
+# Running sums and maxima use a blocked scan instead of ufunc.accumulate,
+# which costs several times an elementwise op per element: one
+# whole-array op per offset inside the blocks, one accumulate over the
+# block totals only, then one op to carry them into each block. There is
+# no loop over paths or over the steps themselves.
+
+def _scan(x, op):
+
+    for k in range(1, x.shape[0]):
+        op(x[k], x[k - 1], out=x[k])
+
+    carry = op.accumulate(x[-1], axis=0)
+    op(x[:, 1:], carry[:-1], out=x[:, 1:])
+
+    return x
+
+
+def _layout(width):
+
+    block = min(SCAN_BLOCK, width)
+    blocks = -(-width // block)
+    itype = np.int16 if block * blocks < 2 ** 15 else np.int32
+
+    # 1-based step number of each cell
+    position = (np.arange(blocks)[:, None] * block + np.arange(block)[:, None, None] + 1).astype(itype)
+
+    return (block, blocks), position
+
+
+# ======================================
+# SAMPLING
+# ======================================
+#
+# "bootstrap" draws steps with replacement, "shuffle" permutes the
+# realized sequence (same final capital, different path). Both fill an
+# index array into the log-growth table, whose last entry is a flat step.
+#
+# Flat steps (return exactly 0, most sessions of a closed-trade equity
+# curve) move neither equity nor drawdown, so only the moving steps are
+# sampled. A bootstrap path of n draws holds Binomial(n, p) of them,
+# p being their share, followed by flat padding. The losing streak
+# therefore counts losses not interrupted by a gain.
+
+def _sample(table, shape, position, lengths, rng, method):
+
+    n_moving = len(table) - 1
+    flat = n_moving
+    n_paths = len(lengths)
+    width = shape[0] * shape[1]
+
+    if method == "bootstrap":
+        index = rng.integers(0, n_moving, size=(*shape, n_paths), dtype=position.dtype)
+        # Padding only starts after the shortest path, in block lo onwards
+        lo = lengths.min() // shape[0]
+        np.copyto(index[:, lo:], flat, where=position[:, lo:] > lengths)
+        return index
+
+    if method == "shuffle":
+        # Sorting random keys that carry the step index in their low bits
+        # is a per-path permutation, and much faster than argsort. 64-bit
+        # keys once the index would leave fewer than 20 random bits.
+        bits = max(1, (n_moving - 1).bit_length())
+        key_type = np.uint32 if bits <= 12 else np.uint64
+        mask = key_type((1 << bits) - 1)
+
+        keys = rng.integers(0, np.iinfo(key_type).max, size=(n_paths, n_moving), dtype=key_type, endpoint=True)
+        keys &= ~mask
+        keys |= np.arange(n_moving, dtype=key_type)
+        keys.sort(axis=1)
+
+        order = np.full((n_paths, width), flat, dtype=position.dtype)
+        np.bitwise_and(keys, mask, out=order[:, :n_moving], casting="unsafe")
+        return order.reshape(n_paths, shape[1], shape[0]).transpose(2, 1, 0)
+
+    raise ValueError(f"Unknown method: {method}")
+
+
+# ======================================
+# PATH STATISTICS
+# ======================================
+
+def _path_stats(logs, position, initial_capital, work):
+
+    peak = work["peak"]
+    last_gain = work["last_gain"]
+    n_paths = logs.shape[2]
+
+    # Longest losing run: position minus the position of the last gain,
+    # counted from 1 so a path with no gain yet counts from its start
+    np.multiply(position, logs >= 0, out=last_gain)
+    _scan(last_gain, np.maximum)
+    np.subtract(position, last_gain, out=last_gain)
+    streak = last_gain.reshape(-1, n_paths).max(axis=0)
+
+    # Log equity, then drawdown from a peak of at least the starting capital
+    _scan(logs, np.add)
+    np.maximum(logs, 0, out=peak)
+    _scan(peak, np.maximum)
+    np.subtract(logs, peak, out=peak)
+    worst = peak.reshape(-1, n_paths).min(axis=0).astype(float)
+
+    final = initial_capital * np.exp(logs[-1, -1].astype(float))
+
+    return final, np.expm1(worst) * 100, streak
+
+
+def _simulate(returns, initial_capital, n_paths, method, seed, batch_elements):
+
+    returns = np.asarray(returns, dtype=float)
+    moving = returns[returns != 0]
+    rng = np.random.default_rng(seed)
+
+    result = {
+        "final_capital": np.full(n_paths, initial_capital, dtype=float),
+        "max_drawdown": np.zeros(n_paths),
+        "losing_streak": np.zeros(n_paths, dtype=np.int32),
+    }
+
+    if len(moving) == 0:
+        return result
+
+    # A step at or below -100% is ruin: log growth -inf, equity 0 from there
+    with np.errstate(divide="ignore"):
+        table = np.log(np.maximum(1 + moving, 0)).astype(np.float32)
+    table = np.append(table, np.float32(0))
+
+    if method == "bootstrap":
+        lengths = rng.binomial(len(returns), len(moving) / len(returns), size=n_paths)
+    else:
+        lengths = np.full(n_paths, len(moving))
+
+    shape, position = _layout(int(lengths.max()))
+    batch_size = max(1, batch_elements // (shape[0] * shape[1]))
+
+    work = None
+
+    for lo in range(0, n_paths, batch_size):
+
+        hi = min(lo + batch_size, n_paths)
+
+        if work is None or work["peak"].shape[2] != hi - lo:
+            work = {
+                "logs": np.empty((*shape, hi - lo), dtype=np.float32),
+                "peak": np.empty((*shape, hi - lo), dtype=np.float32),
+                "last_gain": np.empty((*shape, hi - lo), dtype=position.dtype),
+            }
+
+        index = _sample(table, shape, position, lengths[lo:hi], rng, method)
+        np.take(table, index, out=work["logs"])
+
+        stats = _path_stats(work["logs"], position, initial_capital, work)
+        for name, values in zip(result, stats):
+            result[name][lo:hi] = values
+
+    return result
+
+
+# ======================================
+# MONTE CARLO
+# ======================================
+#
+# Trade paths compound each R at a fixed fraction of capital
+# (capital *= 1 + risk_per_trade * R), i.e. trades taken one after
+# another; the portfolio loop's overlapping positions are not modelled.
+# Return paths resample the daily returns of an equity curve instead,
+# so concurrency is kept but trades lose their identity.
+
+@timed("backtest.monte_carlo")
+def run_monte_carlo(trades, initial_capital=100000, risk_per_trade=0.01, n_paths=N_PATHS,
+                    method="bootstrap", seed=None, batch_elements=BATCH_ELEMENTS):
+
+    returns = np.asarray(trades, dtype=float) * risk_per_trade
+
+    return _simulate(returns, initial_capital, n_paths, method, seed, batch_elements)
+
+
+@timed("backtest.monte_carlo_returns")
+def run_return_monte_carlo(equity_curve, initial_capital=100000, n_paths=N_PATHS,
+                           method="bootstrap", seed=None, batch_elements=BATCH_ELEMENTS):
+
+    equity = np.concatenate([[initial_capital], np.asarray(equity_curve, dtype=float)])
+    returns = equity[1:] / equity[:-1] - 1
+
+    return _simulate(returns, initial_capital, n_paths, method, seed, batch_elements)
+
+
+# ======================================
+# REPORTING
+# ======================================
+
+def percentile_table(result, percentiles=PERCENTILES):
+
+    return pd.DataFrame(
+        {f"p{p}": [np.percentile(values, p) for values in result.values()] for p in percentiles},
+        index=list(result)
+    )
+
+
+# Flat columns for the sweep table; drawdowns are negative, so the 5th
+# percentile is the bad tail
+def summarize_monte_carlo(result, initial_capital=100000):
+
+    final = result["final_capital"]
+    drawdown = result["max_drawdown"]
+    streak = result["losing_streak"]
+
+    return {
+        "mc_final_p5": np.percentile(final, 5),
+        "mc_final_p50": np.percentile(final, 50),
+        "mc_loss_prob": np.mean(final < initial_capital),
+        "mc_drawdown_p50": np.percentile(drawdown, 50),
+        "mc_drawdown_p5": np.percentile(drawdown, 5),
+        "mc_streak_p95": np.percentile(streak, 95),
+    }
+
+
+def print_monte_carlo(result, initial_capital, title):
+
+    print(f"\n===== MONTE CARLO: {title} =====")
+    print(percentile_table(result).round(2).to_string())
+    print("P(loss):", round(np.mean(result["final_capital"] < initial_capital), 4))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Monte Carlo resampling of a backtest's trades and equity")
+    parser.add_argument("strategy", choices=sorted(STRATEGIES))
+    parser.add_argument("--paths", type=int, default=N_PATHS)
+    parser.add_argument("--method", default="bootstrap", choices=METHODS)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    module = importlib.import_module(STRATEGIES[args.strategy])
+
+    with instrumented_run(f"monte-carlo-{args.strategy}"):
+        final_capital, trades, equity_curve = module.run_backtest()
+
+        by_trade = run_monte_carlo(
+            trades, module.INITIAL_CAPITAL, module.RISK_PER_TRADE,
+            n_paths=args.paths, method=args.method, seed=args.seed
+        )
+        by_day = run_return_monte_carlo(
+            equity_curve, module.INITIAL_CAPITAL,
+            n_paths=args.paths, method=args.method, seed=args.seed
+        )
+
+    module.print_results(final_capital, trades, equity_curve)
+    print_monte_carlo(by_trade, module.INITIAL_CAPITAL, f"{len(trades)} TRADES, {args.method}")
+    print_monte_carlo(by_day, module.INITIAL_CAPITAL, f"{len(equity_curve)} SESSIONS, {args.method}")
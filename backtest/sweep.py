@@ -0,0 +1,131 @@
+import argparse
+import importlib
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from backtest.metrics import summarize_results
+
+
+STRATEGIES = {
+    "breakout": "backtest.breakout_trend",
+    "vcp": "backtest.vcp_backtest",
+}
+
+DEFAULT_GRIDS = {
+    "breakout": {
+        "rsi_threshold": [45, 50, 55],
+        "max_portfolio_risk": [0.03, 0.05, 0.08],
+        "breakout_buffer": [1.0, 1.005, 1.01],
+        "volume_multiplier": [1.2, 1.5, 2.0],
+        "max_stop_pct": [0.03, 0.05, 0.08],
+    },
+    "vcp": {
+        "atr_contraction": [0.7, 0.8, 0.9],
+        "volume_multiplier": [1.2, 1.5, 2.0],
+        "max_portfolio_risk": [0.02, 0.04, 0.06],
+    },
+}
+
+MC_SEED = 0
+
+# Set once per worker process so the master panel is not re-sent per task
+_worker = {}
+
+
+# ======================================
+# GRID
+# ======================================
+
+def expand_grid(grid):
+
+    keys = list(grid)
+
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+# ======================================
+# WORKERS
+# ======================================
+
+def _init_worker(strategy, master, mc_paths=0):
+
+    _worker["module"] = importlib.import_module(STRATEGIES[strategy])
+    _worker["master"] = master
+    _worker["mc_paths"] = mc_paths
+
+
+def _run_combination(params):
+
+    module = _worker["module"]
+
+    final_capital, trades, equity_curve = module.run_backtest(_worker["master"], params)
+    summary = summarize_results(final_capital, trades, equity_curve, module.INITIAL_CAPITAL)
+
+    # Same seed for every combination, so they are compared on the same draws
+    if _worker["mc_paths"]:
+        from backtest.monte_carlo import run_monte_carlo, summarize_monte_carlo
+
+        result = run_monte_carlo(
+            trades, module.INITIAL_CAPITAL, module.RISK_PER_TRADE,
+            n_paths=_worker["mc_paths"], seed=MC_SEED
+        )
+        summary.update(summarize_monte_carlo(result, module.INITIAL_CAPITAL))
+
+    return {**params, **summary}
+
+
+# Workers share one copy of the prepared master, also used by backtest.walk_forward
+def worker_pool(strategy, master, max_workers=None, mc_paths=0):
+    return ProcessPoolExecutor(
+        max_workers=max_workers or os.cpu_count(),
+        initializer=_init_worker,
+        initargs=(strategy, master, mc_paths)
+    )
+
+
+# ======================================
+# SWEEP
+# ======================================
+
+def run_sweep(strategy, grid=None, master=None, max_workers=None, mc_paths=0, indicator_dtype=np.float64):
+
+    module = importlib.import_module(STRATEGIES[strategy])
+
+    if grid is None:
+        grid = DEFAULT_GRIDS[strategy]
+
+    # Indicators do not depend on the swept knobs, compute them once.
+    # Every worker holds a copy; float32 indicators shrink it
+    if master is None:
+        master = module.prepare_master(indicator_dtype=indicator_dtype)
+
+    combinations = expand_grid(grid)
+
+    with worker_pool(strategy, master, max_workers, mc_paths) as pool:
+        rows = list(pool.map(_run_combination, combinations))
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Parameter sweep for the portfolio backtests")
+    parser.add_argument("strategy", choices=sorted(STRATEGIES))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--mc-paths", type=int, default=0, help="Monte Carlo paths per combination")
+    parser.add_argument("--float32", action="store_true",
+                        help="Hold compare-only indicators in float32; signals right at a threshold may flip")
+    parser.add_argument("--output", default=None, help="CSV file for the summary table")
+    args = parser.parse_args()
+
+    results = run_sweep(args.strategy, max_workers=args.workers, mc_paths=args.mc_paths,
+                        indicator_dtype=np.float32 if args.float32 else np.float64)
+    results = results.sort_values("total_return", ascending=False)
+
+    print(results.to_string(index=False))
+
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print("\nSaved:", args.output)
@@ -1,134 +1,142 @@
-import pandas as pd
 import numpy as np
-from sqlalchemy import text
-from config.database import engine
+import pandas as pd
+from backtest.engine import run_portfolio
+from backtest.metrics import summarize_results
+from services.price_cache import load_cached_panel
+from services.price_panel import PricePanel
+from services.indicators import add_indicators
 from services.instrument_mapper import get_symbol_list
+from services.instrumentation import instrumented_run, timed
 
 
 INITIAL_CAPITAL = 100000
 RISK_PER_TRADE = 0.01
 MAX_PORTFOLIO_RISK = 0.04
 
+# Tunable knobs, overridden per combination by backtest.sweep
+DEFAULT_PARAMS = {
+    "atr_contraction": 0.8,
+    "volume_multiplier": 1.5,
+    "max_portfolio_risk": MAX_PORTFOLIO_RISK,
+}
+
 START_DATE = "2015-01-01"
 END_DATE = "2026-02-13"
 
+VCP_INDICATORS = ["ema_200", "ema_50", "hh_20", "ll_10", "vol_ma_20", "atr_14", "atr_mean_50"]
+VCP_FIELDS = VCP_INDICATORS + ["trend", "stop", "risk", "target", "entry"]
 
-# ==========================================
-# LOAD STOCK DATA FROM DB
-# ==========================================
-
-def load_stock_data(symbol):
-
-    query = """
-        SELECT date, open, high, low, close, volume
-        FROM daily_prices
-        WHERE symbol = :symbol
-        AND date BETWEEN :start AND :end
-        ORDER BY date
-    """
-
-    with engine.connect() as conn:
-        df = pd.read_sql(text(query), conn, params={
-            "symbol": symbol,
-            "start": START_DATE,
-            "end": END_DATE
-        })
-
-    if df.empty:
-        return None
-
-    df["date"] = pd.to_datetime(df["date"])
-    df.set_index("date", inplace=True)
-
-    return df
+# Only compared against, never traded at (ll_10 sets the stop price), so
+# prepare_master can hold them in float32
+COMPARE_ONLY_FIELDS = ["ema_200", "ema_50", "hh_20", "vol_ma_20", "atr_14", "atr_mean_50"]
 
 
 # ==========================================
 # APPLY VCP LOGIC
 # ==========================================
 
-def apply_vcp_logic(df):
-
-    df = df.copy()
+@timed("backtest.vcp_apply_logic")
+def apply_vcp_logic(df, params=None, symbol=None):
 
-    df["ema_200"] = df["close"].ewm(span=200).mean()
-    df["ema_50"] = df["close"].ewm(span=50).mean()
+    params = {**DEFAULT_PARAMS, **(params or {})}
 
-    df["hh_20"] = df["high"].rolling(20).max().shift(1)
-    df["ll_10"] = df["low"].rolling(10).min().shift(1)
-    df["vol_ma_20"] = df["volume"].rolling(20).mean()
+    df = df.copy()
 
-    # ATR
-    df["tr"] = np.maximum(
-        df["high"] - df["low"],
-        np.maximum(
-            abs(df["high"] - df["close"].shift(1)),
-            abs(df["low"] - df["close"].shift(1))
-        )
-    )
-    df["atr_14"] = df["tr"].rolling(14).mean()
-    df["atr_mean_50"] = df["atr_14"].rolling(50).mean()
+    add_indicators(df, VCP_INDICATORS, symbol=symbol)
 
-    trend = (
+    df["trend"] = (
         (df["close"] > df["ema_200"]) &
         (df["ema_50"] > df["ema_200"]) &
         (df["ema_50"] > df["ema_50"].shift(5))
     )
 
-    contraction = df["atr_14"] < df["atr_mean_50"] * 0.8
+    df["stop"] = df["ll_10"]
+    df["risk"] = df["close"] - df["stop"]
+    df["target"] = df["close"] + 2 * df["risk"]
+
+    df["entry"] = vcp_entry_mask(df, params)
+
+    return df
+
+
+# Row-wise only, so it also works on a PricePanel
+def vcp_entry_mask(df, params):
+
+    contraction = df["atr_14"] < df["atr_mean_50"] * params["atr_contraction"]
 
     breakout = (
         (df["close"] > df["hh_20"]) &
-        (df["volume"] > 1.5 * df["vol_ma_20"])
+        (df["volume"] > params["volume_multiplier"] * df["vol_ma_20"])
     )
 
-    df["entry"] = trend & contraction & breakout
+    return df["trend"] & contraction & breakout & ~(df["risk"] <= 0)
 
-    df["stop"] = df["ll_10"]
-    df["risk"] = df["close"] - df["stop"]
-    df["target"] = df["close"] + 2 * df["risk"]
 
-    df.loc[df["risk"] <= 0, "entry"] = False
+# ==========================================
+# PREPARE MASTER DATA
+# ==========================================
 
-    return df
+@timed("backtest.vcp_prepare_master")
+def prepare_master(symbols=None, indicator_dtype=np.float64):
+
+    if symbols is None:
+        symbols = get_symbol_list()
+    symbols = list(dict.fromkeys(symbols))
+
+    print("Loading:", len(symbols), "symbols")
+    panel = load_cached_panel(symbols, START_DATE, END_DATE, min_bars=300)
+
+    panel.map_symbols(lambda symbol, df: apply_vcp_logic(df, symbol=symbol), VCP_FIELDS)
+
+    return panel.cast(COMPARE_ONLY_FIELDS, indicator_dtype)
 
 
 # ==========================================
-# PREPARE MASTER DATA
+# PORTFOLIO BACKTEST ENGINE
 # ==========================================
 
-def prepare_master():
+def build_signals(panel, params=None):
 
-    symbols = get_symbol_list()
-    frames = []
+    params = {**DEFAULT_PARAMS, **(params or {})}
 
-    for symbol in symbols:
+    signals = panel.select(["low", "high", "close", "stop", "risk", "target"])
 
-        print("Loading:", symbol)
+    signals["gate"] = vcp_entry_mask(panel, params)
+    signals["entry_ok"] = ~np.isnan(panel["stop"]) & ~(panel["risk"] <= 0)
+    signals["entry_price"] = panel["close"]
+    signals["exit_signal"] = np.broadcast_to(False, panel.shape)
 
-        df = load_stock_data(symbol)
+    return signals
 
-        if df is None or len(df) < 300:
-            continue
 
-        df = apply_vcp_logic(df)
-        df["symbol"] = symbol
+def run_backtest(master=None, params=None, initial_capital=INITIAL_CAPITAL, trade_log=None,
+                 close_open=False):
 
-        frames.append(df)
+    if master is None:
+        master = prepare_master()
 
-    master = pd.concat(frames)
-    master.sort_index(inplace=True)
+    params = {**DEFAULT_PARAMS, **(params or {})}
 
-    return master
+    return run_portfolio(
+        build_signals(master, params),
+        initial_capital,
+        RISK_PER_TRADE,
+        params["max_portfolio_risk"],
+        stop_on_ruin=True,
+        trade_log=trade_log,
+        close_open=close_open
+    )
 
 
-# ==========================================
-# PORTFOLIO BACKTEST ENGINE
-# ==========================================
+@timed("backtest.vcp_legacy")
+def run_backtest_legacy(master=None):
 
-def run_backtest():
+    if master is None:
+        master = prepare_master()
 
-    master = prepare_master()
+    # Reference loop over the long date-sorted frame
+    if isinstance(master, PricePanel):
+        master = master.to_frame()
 
     capital = INITIAL_CAPITAL
     equity_curve = []
@@ -222,32 +230,25 @@ def run_backtest():
 
 def print_results(final_capital, trades, equity_curve):
 
-    trades = np.array(trades)
+    summary = summarize_results(final_capital, trades, equity_curve, INITIAL_CAPITAL)
 
-    if len(trades) == 0:
+    if summary["trades"] == 0:
         print("No trades.")
         return
 
-    win_rate = np.mean(trades > 0)
-    profit_factor = abs(trades[trades > 0].sum() / trades[trades < 0].sum())
-    total_return = (final_capital / INITIAL_CAPITAL - 1) * 100
-
-    eq = pd.Series(equity_curve)
-    dd = (eq - eq.cummax()) / eq.cummax()
-    max_dd = dd.min() * 100
-
     print("\n===== VCP PORTFOLIO RESULTS =====")
-    print("Trades:", len(trades))
+    print("Trades:", summary["trades"])
     print("Final Capital:", round(final_capital, 2))
-    print("Win Rate:", round(win_rate, 2))
-    print("Profit Factor:", round(profit_factor, 2))
-    print("Total Return %:", round(total_return, 2))
-    print("Max Drawdown %:", round(max_dd, 2))
+    print("Win Rate:", round(summary["win_rate"], 2))
+    print("Profit Factor:", round(summary["profit_factor"], 2))
+    print("Total Return %:", round(summary["total_return"], 2))
+    print("Max Drawdown %:", round(summary["max_drawdown"], 2))
 
 
 # ==========================================
 
 if __name__ == "__main__":
 
-    final_capital, trades, equity_curve = run_backtest()
+    with instrumented_run("backtest-vcp"):
+        final_capital, trades, equity_curve = run_backtest()
     print_results(final_capital, trades, equity_curve)
@@ -0,0 +1,198 @@
+import argparse
+import importlib
+import numpy as np
+import pandas as pd
+from backtest.metrics import summarize_results
+from backtest.sweep import DEFAULT_GRIDS, STRATEGIES, _worker, expand_grid, worker_pool
+from services.instrumentation import instrumented_run
+
+
+TRAIN_SESSIONS = 756   # ~3 years
+TEST_SESSIONS = 126    # ~6 months
+OBJECTIVE = "total_return"
+MIN_TRADES = 5         # windows where no train result reaches this are skipped
+
+
+# ======================================
+# WINDOWS
+# ======================================
+#
+# Row ranges over the panel's sessions. Test slices follow their train
+# slice back to back and do not overlap, so the out-of-sample pieces
+# cover the history after the first train window exactly once.
+
+def rolling_windows(n_sessions, train=TRAIN_SESSIONS, test=TEST_SESSIONS):
+
+    windows = []
+    start = 0
+
+    while start + train < n_sessions:
+        test_end = min(start + train + test, n_sessions)
+        windows.append((start, start + train, start + train, test_end))
+        start += test
+
+    return windows
+
+
+# ======================================
+# WORKERS
+# ======================================
+#
+# Indicators are computed once in prepare_master; every task slices the
+# worker's copy of the panel by rows (a view, nothing is reloaded).
+# Positions still open when a slice ends are closed at the slice's last
+# close, so long trend trades count in both the train objective and the
+# out-of-sample equity instead of vanishing with zero P&L.
+
+def _run_slice(task):
+
+    lo, hi, params = task
+    module = _worker["module"]
+
+    final_capital, trades, equity_curve = module.run_backtest(
+        _worker["master"].slice_rows(lo, hi), params, close_open=True
+    )
+
+    return summarize_results(final_capital, trades, equity_curve, module.INITIAL_CAPITAL)
+
+
+def _score(summary, objective, min_trades):
+
+    value = summary[objective]
+
+    # inf (a profit_factor with no losing trade) and NaN never win
+    if summary["trades"] < min_trades or not np.isfinite(value):
+        return -np.inf
+
+    return value
+
+
+# ======================================
+# WALK-FORWARD
+# ======================================
+
+def run_walk_forward(strategy, grid=None, master=None, train=TRAIN_SESSIONS, test=TEST_SESSIONS,
+                     objective=OBJECTIVE, min_trades=MIN_TRADES, max_workers=None):
+
+    module = importlib.import_module(STRATEGIES[strategy])
+
+    if grid is None:
+        grid = DEFAULT_GRIDS[strategy]
+
+    if master is None:
+        master = module.prepare_master()
+
+    combinations = expand_grid(grid)
+    windows = rolling_windows(len(master.dates), train, test)
+
+    if not windows:
+        raise ValueError(f"{len(master.dates)} sessions is not enough for a {train}-session train window")
+
+    # Every (window, combination) train run at once, windows run in parallel
+    train_tasks = [(lo, hi, params) for lo, hi, _, _ in windows for params in combinations]
+
+    with worker_pool(strategy, master, max_workers) as pool:
+        train_results = list(pool.map(_run_slice, train_tasks))
+
+    # Test slices chain the capital carried out of the previous slice.
+    # They are one cheap run per window, so they run here in order;
+    # rescaling independent runs instead would break ties at the
+    # portfolio risk cap differently.
+    capital = module.INITIAL_CAPITAL
+    rows = []
+    curves = []
+    oos_trades = []
+
+    for w, (train_lo, train_hi, test_lo, test_hi) in enumerate(windows):
+
+        results = train_results[w * len(combinations):(w + 1) * len(combinations)]
+        scores = [_score(r, objective, min_trades) for r in results]
+        best = int(np.argmax(scores))
+        selected = bool(np.isfinite(scores[best]))
+
+        if selected:
+            params, train_summary = combinations[best], results[best]
+
+            final_capital, trades, curve = module.run_backtest(
+                master.slice_rows(test_lo, test_hi), params, initial_capital=capital, close_open=True
+            )
+        else:
+            # Every score is -inf, so argmax would just pick the first
+            # combination; the test slice is sat out in cash instead
+            print(f"WARNING: no combination reached {min_trades} train trades for the test slice "
+                  f"{master.dates[test_lo].date()} to {master.dates[test_hi - 1].date()}, skipping it")
+
+            params = dict.fromkeys(combinations[0])
+            train_summary = {objective: np.nan, "trades": max(r["trades"] for r in results)}
+            final_capital, trades, curve = capital, [], [capital] * (test_hi - test_lo)
+
+        test_summary = summarize_results(final_capital, trades, curve, capital)
+
+        curves.append(pd.Series(curve, index=master.dates[test_lo:test_lo + len(curve)], dtype=float))
+        oos_trades.extend(trades)
+
+        rows.append({
+            "train_start": master.dates[train_lo],
+            "train_end": master.dates[train_hi - 1],
+            "test_start": master.dates[test_lo],
+            "test_end": master.dates[test_hi - 1],
+            "selected": selected,
+            **params,
+            f"train_{objective}": train_summary[objective],
+            "train_trades": train_summary["trades"],
+            "test_trades": test_summary["trades"],
+            "test_return": test_summary["total_return"],
+            "test_max_drawdown": test_summary["max_drawdown"],
+        })
+
+        capital = final_capital
+
+        # stop_on_ruin strategies end the walk once capital is gone
+        if capital <= 0:
+            break
+
+    equity = pd.concat(curves) if curves else pd.Series(dtype=float)
+    summary = summarize_results(capital, oos_trades, equity.tolist(), module.INITIAL_CAPITAL)
+
+    return {
+        "windows": pd.DataFrame(rows),
+        "equity": equity,
+        "summary": summary,
+    }
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Walk-forward optimization over the sweep grids")
+    parser.add_argument("strategy", choices=sorted(STRATEGIES))
+    parser.add_argument("--train", type=int, default=TRAIN_SESSIONS, help="Train window in sessions")
+    parser.add_argument("--test", type=int, default=TEST_SESSIONS, help="Test window in sessions")
+    parser.add_argument("--objective", default=OBJECTIVE,
+                        choices=["total_return", "profit_factor", "win_rate", "max_drawdown"])
+    parser.add_argument("--min-trades", type=int, default=MIN_TRADES)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default=None, help="CSV file for the stitched out-of-sample equity")
+    args = parser.parse_args()
+
+    with instrumented_run(f"walk-forward-{args.strategy}"):
+        result = run_walk_forward(
+            args.strategy,
+            train=args.train,
+            test=args.test,
+            objective=args.objective,
+            min_trades=args.min_trades,
+            max_workers=args.workers,
+        )
+
+    print(result["windows"].to_string(index=False))
+
+    summary = result["summary"]
+    print("\n===== OUT-OF-SAMPLE =====")
+    print("Trades:", summary["trades"])
+    print("Final Capital:", round(summary["final_capital"], 2))
+    print("Total Return %:", round(summary["total_return"], 2))
+    print("Max Drawdown %:", round(summary["max_drawdown"], 2))
+
+    if args.output:
+        result["equity"].rename("equity").to_csv(args.output)
+        print("\nSaved:", args.output)
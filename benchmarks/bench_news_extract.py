@@ -0,0 +1,39 @@
+import glob
+import os
+import time
+from services.news_fetcher import (
+    MIN_ARTICLE_CHARS,
+    _extract_with_soup,
+    extract_text_from_html,
+)
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "news")
+ROUNDS = 200
+
+
+def _time(fn, html, rounds=ROUNDS):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        text = fn(html)
+    return (time.perf_counter() - start) / rounds * 1000, text
+
+
+def main():
+
+    print(f"{'fixture':<26} {'soup ms':>8} {'fast ms':>8} {'chars':>6}  path")
+
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+
+        soup_ms, _ = _time(_extract_with_soup, html)
+        fast_ms, text = _time(extract_text_from_html, html)
+
+        route = "http" if len(text) >= MIN_ARTICLE_CHARS else "browser fallback"
+
+        print(f"{os.path.basename(path):<26} {soup_ms:>8.3f} {fast_ms:>8.3f} {len(text):>6}  {route}")
+
+
+if __name__ == "__main__":
+    main()
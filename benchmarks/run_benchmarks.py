@@ -0,0 +1,256 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from benchmarks.synthetic import create_price_table, generate_symbol, generate_universe
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+REPLAY_SESSIONS = 250
+
+
+# ==========================================
+# OFFLINE ENVIRONMENT
+# ==========================================
+#
+# Every service reads its database, cache and state locations from the
+# environment at import time, so these are set before any service module
+# is imported. Nothing touches Postgres, Upstox or the real data/ folder.
+
+def _point_services_at(workdir):
+
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "prices.sqlite3")
+    os.environ["PRICE_CACHE_DIR"] = os.path.join(workdir, "price_cache")
+    os.environ["CACHE_DB_FILE"] = os.path.join(workdir, "cache.sqlite3")
+    os.environ["INDICATOR_STATE_FILE"] = os.path.join(workdir, "indicator_state.json")
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(__file__), stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# ==========================================
+# TIMING
+# ==========================================
+
+def _measure(fn, repeat, setup=None):
+
+    timings = []
+    info = None
+
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        info = fn()
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "repeat": repeat,
+        "min_s": round(min(timings), 6),
+        "median_s": round(statistics.median(timings), 6),
+        **(info or {}),
+    }
+
+
+def _backtest_info(result):
+    capital, trades, _ = result
+    return {"trades": len(trades), "final_capital": round(float(capital), 6)}
+
+
+# ==========================================
+# SUITE
+# ==========================================
+
+def run_suite(symbol_count=50, years=5, seed=0, repeat=3, legacy=True, workdir=None):
+
+    own_workdir = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix="stock-screener-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    _point_services_at(workdir)
+
+    from sqlalchemy import text
+    from config.database import engine
+    from services.instrument_mapper import get_symbol_list
+    from services.db_writer import store_prices
+    from services.db_data_loader import load_universe_data
+    from services.price_cache import load_cached_panel, load_cached_universe
+    from services.indicators import add_indicators, clear_indicator_cache
+    from services.indicator_state import build_state
+    from services.instrumentation import report, reset
+    import vcp_scanner
+    import breakout_scanner
+    import scan_orchestrator
+    from backtest import breakout_trend, vcp_backtest
+
+    # Real names, so the backtests' stock-list ordering applies unchanged
+    symbols = get_symbol_list()[:symbol_count]
+    frames = generate_universe(symbols, years, seed)
+    nifty_df = generate_symbol("NIFTY 50", years, seed)
+
+    cache_dir = os.environ["PRICE_CACHE_DIR"]
+    indicators = list(dict.fromkeys(vcp_scanner.VCP_INDICATORS + breakout_scanner.BREAKOUT_INDICATORS))
+    last_date = max(df.index[-1] for df in frames.values())
+    replay_start = sorted({d for df in frames.values() for d in df.index})[-REPLAY_SESSIONS]
+
+    reset()
+
+    results = {}
+    masters = {}
+    backtests = {}
+
+    def clear_prices():
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM daily_prices"))
+
+    def clear_cache_dir():
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        clear_indicator_cache()
+
+    def fresh_frames():
+        clear_indicator_cache()
+        return {s: df.copy() for s, df in frames.items()}
+
+    def run(name, fn, setup=clear_indicator_cache, repeat=repeat):
+        results[name] = _measure(fn, repeat, setup)
+        print(f"{name:<32} {results[name]['min_s']:>10.4f} s")
+
+    create_price_table(os.environ["DATABASE_URL"]).dispose()
+
+    # ----- Ingestion -----
+    run("ingest_store_prices", lambda: store_prices(frames), setup=clear_prices)
+    run("ingest_store_prices_conflict", lambda: store_prices(frames))
+
+    # ----- Loading -----
+    run("load_universe_sql", lambda: {"symbols": len(load_universe_data(symbols))})
+    run("load_price_cache_cold", lambda: {"symbols": len(load_cached_universe(symbols, cache_dir=cache_dir))},
+        setup=clear_cache_dir)
+    run("load_price_cache_warm", lambda: {"symbols": len(load_cached_universe(symbols, cache_dir=cache_dir))})
+    run("load_price_panel_warm", lambda: {"symbols": len(load_cached_panel(symbols, cache_dir=cache_dir).symbols)})
+
+    # ----- Indicators -----
+    working = {}
+
+    def compute_indicators():
+        for symbol, df in working.items():
+            add_indicators(df, indicators, symbol=symbol)
+
+    run("indicators_cold", compute_indicators, setup=lambda: working.update(fresh_frames()))
+    run("indicators_warm", compute_indicators, setup=None)
+
+    states = {}
+
+    def build_states():
+        states.update({s: build_state(df) for s, df in frames.items()})
+        states[breakout_scanner.NIFTY_KEY] = build_state(nifty_df)
+
+    run("indicator_state_build", build_states)
+
+    # ----- Scanning -----
+    scan_date = last_date.strftime("%Y-%m-%d")
+
+    run("scan_vcp", lambda: {"signals": len(vcp_scanner.run_vcp_scan(symbols=symbols))})
+    run("scan_vcp_replay", lambda: {
+        "sessions": REPLAY_SESSIONS,
+        "signals": len(vcp_scanner.run_vcp_replay(replay_start.strftime("%Y-%m-%d"), symbols=symbols)),
+    })
+    run("scan_vcp_orchestrated", lambda: {
+        "signals": len(scan_orchestrator.run_scan(["vcp"], symbols, scan_date=scan_date)),
+    })
+    run("scan_breakout_state", lambda: {
+        "signals": sum(len(x) for x in breakout_scanner.run_state_scan(states, symbols)),
+    })
+
+    # ----- Backtests -----
+    # Panel size next to the long one-row-per-bar frame it replaced
+    def panel_info(panel):
+        return {
+            "panel_bytes": int(panel.nbytes),
+            "long_frame_bytes": int(panel.to_frame().memory_usage(deep=True).sum()),
+        }
+
+    def prepare_breakout():
+        masters["breakout"] = breakout_trend.prepare_master(symbols, nifty_df.copy())
+
+    def prepare_vcp():
+        masters["vcp"] = vcp_backtest.prepare_master(symbols)
+
+    run("backtest_prepare_breakout", prepare_breakout)
+    run("backtest_prepare_vcp", prepare_vcp)
+
+    for strategy in ["breakout", "vcp"]:
+        results[f"backtest_prepare_{strategy}"].update(panel_info(masters[strategy]))
+
+    engines = [
+        ("breakout", "vectorized", breakout_trend.run_backtest),
+        ("vcp", "vectorized", vcp_backtest.run_backtest),
+    ]
+    if legacy:
+        engines += [
+            ("breakout", "legacy", breakout_trend.run_backtest_legacy),
+            ("vcp", "legacy", vcp_backtest.run_backtest_legacy),
+        ]
+
+    for strategy, kind, fn in engines:
+
+        def run_engine(strategy=strategy, kind=kind, fn=fn):
+            backtests[(strategy, kind)] = fn(masters[strategy])
+            return _backtest_info(backtests[(strategy, kind)])
+
+        # The legacy loops are slow and deterministic, one run is enough
+        run(f"backtest_{strategy}_{kind}", run_engine, setup=None, repeat=1 if kind == "legacy" else repeat)
+
+    for strategy in ["breakout", "vcp"]:
+        if (strategy, "legacy") in backtests:
+            fast = _backtest_info(backtests[(strategy, "vectorized")])
+            slow = _backtest_info(backtests[(strategy, "legacy")])
+            results[f"backtest_{strategy}_vectorized"]["matches_legacy"] = fast == slow
+
+    if own_workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": {"symbols": len(symbols), "years": years, "seed": seed, "repeat": repeat},
+        "results": results,
+        "spans": report(),
+    }
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Offline benchmarks on synthetic OHLCV")
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-legacy", action="store_true", help="Skip the per-date legacy backtest loops")
+    parser.add_argument("--workdir", help="Keep the SQLite fixture and caches here")
+    parser.add_argument("--output", help="JSON results file, default benchmarks/results/<commit>.json")
+    args = parser.parse_args()
+
+    report = run_suite(args.symbols, args.years, args.seed, args.repeat, not args.skip_legacy, args.workdir)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\nWrote {output}")
@@ -0,0 +1,78 @@
+import zlib
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+
+START_DATE = "2015-01-01"
+TRADING_DAYS = 252
+MISSING_BAR_RATE = 0.01     # suspended sessions, exercises the validity mask
+
+
+# ==========================================
+# SYNTHETIC OHLCV
+# ==========================================
+#
+# Geometric random walk with drift and volatility regimes plus volume
+# spikes, so the breakout and VCP rules fire now and then. Every symbol
+# is seeded from (seed, symbol), so a symbol's series does not depend
+# on which other symbols are generated alongside it.
+
+def _symbol_rng(symbol, seed):
+    return np.random.default_rng([seed, zlib.crc32(symbol.encode("utf-8"))])
+
+
+def generate_symbol(symbol, years=5, seed=0, start_date=START_DATE):
+
+    rng = _symbol_rng(symbol, seed)
+
+    dates = pd.bdate_range(start_date, periods=int(years * TRADING_DAYS))
+
+    # Listings start at different times
+    dates = dates[rng.integers(0, TRADING_DAYS // 2):]
+    dates = dates[rng.random(len(dates)) >= MISSING_BAR_RATE]
+
+    n = len(dates)
+
+    # Drift and volatility change in blocks, quiet stretches give VCP
+    # its ATR contractions
+    regime = np.repeat(rng.normal(0.0005, 0.0015, n // 60 + 1), 60)[:n]
+    volatility = rng.uniform(0.01, 0.03) * np.repeat(rng.uniform(0.4, 1.6, n // 20 + 1), 20)[:n]
+    returns = regime + rng.normal(0, 1, n) * volatility
+
+    close = rng.uniform(50, 2000) * np.exp(np.cumsum(returns))
+    open_ = close * np.exp(rng.normal(0, volatility / 3, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, volatility / 2, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, volatility / 2, n)))
+
+    volume = rng.lognormal(13, 0.4, n) * np.where(rng.random(n) < 0.05, 3.0, 1.0)
+
+    df = pd.DataFrame({
+        "open": open_.round(2),
+        "high": high.round(2),
+        "low": low.round(2),
+        "close": close.round(2),
+        "volume": volume.astype("int64"),
+    }, index=pd.DatetimeIndex(dates, name="date"))
+
+    return df
+
+
+def generate_universe(symbols, years=5, seed=0, start_date=START_DATE):
+    return {symbol: generate_symbol(symbol, years, seed, start_date) for symbol in symbols}
+
+
+# ==========================================
+# SQLITE daily_prices FIXTURE
+# ==========================================
+
+def create_price_table(url):
+
+    # Imported here: config.database reads DATABASE_URL at import time
+    from services.db_schema import migrate
+
+    engine = create_engine(url)
+    migrate(engine=engine)
+
+    return engine
+
@@ -3,124 +3,196 @@ from datetime import datetime, timedelta
 from services.upstox_data import load_stock_data
 from services.instrument_mapper import get_instrument_key
 from services.instrument_mapper import get_symbol_list
-from services.db_data_loader import load_stock_data as load_db_stock_data
-from services.news_fetcher import fetch_news
-from services.sentiment_analyzer import analyze_sentiment
+from services.db_data_loader import load_universe_data
+from services.indicators import add_indicators
+from services.indicator_state import load_states
 
 
 CAPITAL = 100000
 RISK_PER_TRADE = 0.01
-SCAN_DATE = (datetime.today()).strftime("%Y-%m-%d")
-SYMBOLS = get_symbol_list()
-today = datetime.today()
-start_date = (today - timedelta(days=500)).strftime("%Y-%m-%d")
+LOOKBACK_DAYS = 500
 
-print("Start Date: ", start_date)
-print("End Date: ", SCAN_DATE)
+BREAKOUT_INDICATORS = ["ema_200", "hh_20", "ll_10", "ll_7", "vol_ma_20", "rsi"]
+NIFTY_KEY = "NSE_INDEX|Nifty 50"
 
 
-def calculate_rsi(df, period=14):
-    delta = df['close'].diff()
-    up = delta.clip(lower=0)
-    down = -delta.clip(upper=0)
-    ema_up = up.ewm(com=period - 1, adjust=False).mean()
-    ema_down = down.ewm(com=period - 1, adjust=False).mean()
-    rs = ema_up / ema_down
-    df['rsi'] = 100 - 100 / (1 + rs)
-    return df
+def evaluate_latest(symbol, latest, market_ok):
 
-def run_daily_scan():
+    entry_signal = None
+
+    # ===== ENTRY CONDITIONS =====
+    trend_condition = latest["close"] > latest["ema_200"]
+    breakout_condition = latest["close"] > latest["hh_20"] * 1.005
+    volume_condition = latest["volume"] > 1.5 * latest["vol_ma_20"]
+    rsi_satisfied = not pd.isna(latest['rsi']) and latest['rsi'] >= 50  # Tune: 55 for stricter (lower DD, fewer trades), 45 for looser
+
+    if market_ok and trend_condition and breakout_condition and volume_condition and rsi_satisfied:
+
+        entry = latest["close"]
+        stop = latest["ll_7"]
+
+        # Skips the exit check as well, same as before
+        if pd.isna(stop):
+            return None, False
+
+        # ===== APPLY 5% MAX STOP LOSS CAP =====
+        max_stop_price = entry * (1 - 0.05)   # 5% cap
+        stop = max(stop, max_stop_price)
+        risk = entry - stop
+
+        if risk <= 0:
+            return None, False
+
+        risk_amount = CAPITAL * RISK_PER_TRADE
+        qty = int(risk_amount / risk)
+
+        if qty > 0:
+            entry_signal = {
+                "symbol": symbol,
+                "entry": round(entry, 2),
+                "stop": round(stop, 2),
+                "qty": qty
+            }
+
+    # ===== EXIT CONDITION =====
+    is_exit = latest["close"] < latest["ll_7"]
+
+    return entry_signal, is_exit
+
+
+def scan_window(scan_date=None, lookback_days=LOOKBACK_DAYS):
+
+    end = pd.Timestamp(scan_date) if scan_date else pd.Timestamp(datetime.today().date())
+    start = end - timedelta(days=lookback_days)
+
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+
+def run_daily_scan(scan_date=None, symbols=None, lookback_days=LOOKBACK_DAYS):
 
     entries = []
     exits = []
 
+    if symbols is None:
+        symbols = get_symbol_list()
+
+    start_date, scan_date = scan_window(scan_date, lookback_days)
+
+    print("Start Date: ", start_date)
+    print("End Date: ", scan_date)
+
     # ===== Load Nifty =====
-    nifty_key = "NSE_INDEX|Nifty 50"
-    nifty_df = load_stock_data(nifty_key, start_date, SCAN_DATE)
+    nifty_df = load_stock_data(NIFTY_KEY, start_date, scan_date)
 
     if nifty_df is None or len(nifty_df) < 300:
         print("Nifty data insufficient.")
         return [], []
 
-    nifty_df["ema_200"] = nifty_df["close"].ewm(span=200).mean()
+    add_indicators(nifty_df, ["ema_200"])
     nifty_latest = nifty_df.iloc[-1]
 
     market_ok = nifty_latest["close"] > nifty_latest["ema_200"]
 
     # ===== Loop Stocks =====
-    for symbol in SYMBOLS:
+    universe = load_universe_data(symbols, start_date, scan_date)
 
-        # instrument_key = get_instrument_key(symbol)
+    for symbol in symbols:
 
-        # if instrument_key is None:
-        #     continue
-
-        df = load_db_stock_data(symbol, start_date, SCAN_DATE)
+        df = universe.get(symbol)
         if df is None or len(df) < 300:
             continue
 
         # Indicators
-        df["ema_200"] = df["close"].ewm(span=200).mean()
-        df["hh_20"] = df["high"].rolling(20).max().shift(1)
-        df["ll_10"] = df["low"].rolling(10).min().shift(1)
-        df["ll_7"] = df["low"].rolling(7).min().shift(1)
-        df["vol_ma_20"] = df["volume"].rolling(20).mean()
-        df = calculate_rsi(df, period=14)
-        latest = df.iloc[-1]
-
-        # ===== ENTRY CONDITIONS =====
-        trend_condition = latest["close"] > latest["ema_200"]
-        breakout_condition = latest["close"] > latest["hh_20"] * 1.005
-        volume_condition = latest["volume"] > 1.5 * latest["vol_ma_20"]
-        rsi_satisfied = not pd.isna(latest['rsi']) and latest['rsi'] >= 50  # Tune: 55 for stricter (lower DD, fewer trades), 45 for looser
-
-        if market_ok and trend_condition and breakout_condition and volume_condition and rsi_satisfied:
-
-            entry = latest["close"]
-            stop = latest["ll_7"]
-
-            if pd.isna(stop):
-                continue
-
-            # ===== APPLY 5% MAX STOP LOSS CAP =====
-            max_stop_price = entry * (1 - 0.05)   # 5% cap
-            stop = max(stop, max_stop_price)
-            risk = entry - stop
-
-            if risk <= 0:
-                continue
-
-            risk_amount = CAPITAL * RISK_PER_TRADE
-            qty = int(risk_amount / risk)
-
-            if qty > 0:
-                entries.append({
-                    "symbol": symbol,
-                    "entry": round(entry, 2),
-                    "stop": round(stop, 2),
-                    "qty": qty
-                })
-
-        # ===== EXIT CONDITION =====
-        if latest["close"] < latest["ll_7"]:
+        add_indicators(df, BREAKOUT_INDICATORS, symbol=symbol)
+
+        entry_signal, is_exit = evaluate_latest(symbol, df.iloc[-1], market_ok)
+
+        if entry_signal:
+            entries.append(entry_signal)
+        if is_exit:
             exits.append(symbol)
 
     return entries, exits
 
 
-if __name__ == "__main__":
+# Reads the indicator state advanced by scripts/update_daily_data.py
+# instead of reloading and recomputing the history. The state EMAs run
+# over the full history, not the LOOKBACK_DAYS window, so near a
+# threshold the two scans can disagree (see services.indicator_state)
+def run_state_scan(states=None, symbols=None):
 
-    entries, exits = run_daily_scan()
+    if states is None:
+        states = load_states()
+    if symbols is None:
+        symbols = get_symbol_list()
 
-    print(f"\n===== BREAKOUT SCAN FOR {SCAN_DATE}=====")
+    entries = []
+    exits = []
+
+    nifty_state = states.get(NIFTY_KEY)
+
+    if nifty_state is None or nifty_state["bars"] < 300:
+        print("Nifty state insufficient.")
+        return [], []
+
+    nifty_latest = nifty_state["latest"]
+    market_ok = nifty_latest["close"] > nifty_latest["ema_200"]
+
+    for symbol in symbols:
+
+        state = states.get(symbol)
+        if state is None or state["bars"] < 300:
+            continue
+
+        entry_signal, is_exit = evaluate_latest(symbol, state["latest"], market_ok)
+
+        if entry_signal:
+            entries.append(entry_signal)
+        if is_exit:
+            exits.append(symbol)
+
+    return entries, exits
+
+
+# News and sentiment pull in Playwright and OpenAI, so they are only
+# imported when entries need them
+def score_entries(entries):
+
+    from services.news_fetcher import fetch_news_many
+    from services.news_compactor import compact_articles
+    from services.sentiment_analyzer import analyze_many
+
+    # One shared browser serves every entry symbol
+    news = fetch_news_many([e['symbol'] for e in entries])
+
+    # Drop duplicate/boilerplate text before paying for prompt tokens
+    tokens_saved = 0
+    for symbol, articles in news.items():
+        news[symbol], report = compact_articles(symbol, articles)
+        tokens_saved += report["tokens_saved"]
+    if news:
+        print(f"News compaction saved {tokens_saved} prompt tokens")
+
+    return analyze_many(news)
+
+
+def print_scan(scan_date, entries, exits, with_news=True):
+
+    print(f"\n===== BREAKOUT SCAN FOR {scan_date}=====")
 
     print("\n--- ENTRY SIGNALS ---")
     if not entries:
         print("No entries today.")
+
+    sentiments = score_entries(entries) if with_news and entries else {}
+
     for e in entries:
-        headlines = fetch_news(e['symbol'])
-        sentiment = analyze_sentiment(e['symbol'], headlines)
-        print(f"{e['symbol']} | Entry: {e['entry']} | Stop: {e['stop']} | Qty: {e['qty']} | Sentiment: {sentiment['score']} | Decision: {sentiment['decision']}")
+        line = f"{e['symbol']} | Entry: {e['entry']} | Stop: {e['stop']} | Qty: {e['qty']}"
+        sentiment = sentiments.get(e['symbol'])
+        if sentiment is None:
+            print(line)
+            continue
+        print(f"{line} | Sentiment: {sentiment['score']} | Decision: {sentiment['decision']}")
         print(f"Reason: {sentiment['reason']}")
         print(f"Risks: {sentiment['risks']}")
         print(f"Summary: {sentiment['summary']}")
@@ -131,3 +203,12 @@ if __name__ == "__main__":
         print("No exits today.")
     for symbol in exits:
         print(symbol)
+
+
+# ==========================================
+# Options (--date, --state, --no-news) live in scan.py
+
+if __name__ == "__main__":
+
+    entries, exits = run_daily_scan()
+    print_scan(scan_window()[1], entries, exits)
@@ -0,0 +1,98 @@
+import argparse
+from datetime import datetime
+from services.instrumentation import instrumented_run
+
+
+# ==========================================
+# COMMAND LINE
+# ==========================================
+#
+#   python scan.py breakout [--date 2026-02-12 | --state] [--no-news]
+#   python scan.py vcp [--date 2026-02-12 | --state | --replay 2025-01-01 [2025-12-31]]
+#   python scan.py --profile cprofile breakout ...
+#
+# Every run ends with a timing summary and a JSON report in data/timing/.
+#
+# Scanner modules are imported per command so each one only pays for
+# its own dependencies.
+
+def run_breakout(args):
+
+    import breakout_scanner
+
+    if args.state:
+        entries, exits = breakout_scanner.run_state_scan()
+        scan_date = "latest state"
+    else:
+        entries, exits = breakout_scanner.run_daily_scan(scan_date=args.date)
+        scan_date = breakout_scanner.scan_window(args.date)[1]
+
+    breakout_scanner.print_scan(scan_date, entries, exits, with_news=not args.no_news)
+
+
+def run_vcp(args):
+
+    import vcp_scanner
+
+    if args.replay:
+        entries = vcp_scanner.run_vcp_replay(*args.replay)
+    elif args.state:
+        entries = vcp_scanner.run_vcp_state_scan()
+    else:
+        entries = vcp_scanner.run_vcp_scan(args.date)
+
+    vcp_scanner.print_entries(entries)
+
+
+def date_arg(value):
+
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a YYYY-MM-DD date: {value!r}")
+
+    return value
+
+
+def build_parser():
+
+    parser = argparse.ArgumentParser(prog="scan", description="Run a stock scanner")
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"], help="Profile the whole run")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    breakout = commands.add_parser("breakout", help="Breakout entries and exits")
+    # The state only holds the latest bar, so it cannot scan as of a date
+    mode = breakout.add_mutually_exclusive_group()
+    mode.add_argument("--date", type=date_arg, help="Scan as of this date (YYYY-MM-DD), default today")
+    mode.add_argument("--state", action="store_true", help="Read the saved indicator state")
+    breakout.add_argument("--no-news", action="store_true", help="Skip news and sentiment")
+    breakout.set_defaults(handler=run_breakout)
+
+    vcp = commands.add_parser("vcp", help="VCP entries")
+    mode = vcp.add_mutually_exclusive_group()
+    mode.add_argument("--date", type=date_arg, help="Scan as of this date (YYYY-MM-DD), default latest bar")
+    mode.add_argument("--state", action="store_true", help="Read the saved indicator state")
+    mode.add_argument("--replay", nargs="+", type=date_arg, metavar="DATE",
+                      help="START [END]: signals on every session in the range, END defaults to the latest bar")
+    vcp.set_defaults(handler=run_vcp)
+
+    return parser
+
+
+def main(argv=None):
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command == "vcp" and args.replay:
+        if len(args.replay) > 2:
+            parser.error("--replay takes START [END]")
+        if len(args.replay) == 2 and args.replay[1] < args.replay[0]:
+            parser.error("--replay END is before START")
+
+    with instrumented_run(f"scan-{args.command}", profiler=args.profile):
+        args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
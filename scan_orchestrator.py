@@ -0,0 +1,234 @@
+import sys
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from services.db_data_loader import load_universe_data
+from services.instrument_mapper import get_symbol_list
+from services.indicators import add_indicators
+from services.upstox_data import load_stock_data
+import vcp_scanner
+import breakout_scanner
+
+
+MIN_BARS = 300
+SIGNAL_COLUMNS = ["strategy", "symbol", "signal", "entry", "stop", "target", "qty"]
+
+
+# ==========================================
+# STRATEGY PLUGINS
+# ==========================================
+#
+# A strategy names the indicator columns it reads and turns one
+# symbol's latest row (a dict, same shape as an indicator-state
+# snapshot) into zero or more signal rows.
+#
+# lookback_days is the calendar window its standalone scanner computes
+# indicators over (None for the full history). EMAs depend on where the
+# series starts, so each window gets its own indicator pass.
+
+class ScanStrategy:
+
+    name = None
+    indicators = []
+    min_bars = MIN_BARS
+    lookback_days = None
+
+    def prepare(self, context):
+        return True
+
+    def evaluate(self, symbol, latest, context):
+        return []
+
+
+STRATEGIES = {}
+
+
+def register_strategy(strategy):
+    STRATEGIES[strategy.name] = strategy
+    return strategy
+
+
+class VCPStrategy(ScanStrategy):
+
+    name = "vcp"
+    indicators = vcp_scanner.VCP_INDICATORS + ["ema_50_shift_5"]
+
+    def evaluate(self, symbol, latest, context):
+
+        entry = vcp_scanner.size_entry(symbol, vcp_scanner.apply_vcp_state(latest))
+
+        if entry is None:
+            return []
+
+        return [{
+            "signal": "entry",
+            "entry": entry["entry_price"],
+            "stop": entry["stop"],
+            "target": entry["target"],
+            "qty": entry["qty"],
+        }]
+
+
+class BreakoutStrategy(ScanStrategy):
+
+    name = "breakout"
+    indicators = breakout_scanner.BREAKOUT_INDICATORS
+    lookback_days = breakout_scanner.LOOKBACK_DAYS
+
+    def prepare(self, context):
+
+        start_date, scan_date = breakout_scanner.scan_window(context["scan_date"], self.lookback_days)
+        nifty_df = load_stock_data(breakout_scanner.NIFTY_KEY, start_date, scan_date)
+
+        if nifty_df is None or len(nifty_df) < self.min_bars:
+            print("Nifty data insufficient.")
+            return False
+
+        add_indicators(nifty_df, ["ema_200"])
+        nifty_latest = nifty_df.iloc[-1]
+
+        context["market_ok"] = nifty_latest["close"] > nifty_latest["ema_200"]
+
+        return True
+
+    def evaluate(self, symbol, latest, context):
+
+        entry, is_exit = breakout_scanner.evaluate_latest(symbol, latest, context["market_ok"])
+
+        signals = []
+
+        if entry:
+            signals.append({
+                "signal": "entry",
+                "entry": entry["entry"],
+                "stop": entry["stop"],
+                "target": np.nan,
+                "qty": entry["qty"],
+            })
+
+        if is_exit:
+            signals.append({"signal": "exit"})
+
+        return signals
+
+
+register_strategy(VCPStrategy())
+register_strategy(BreakoutStrategy())
+
+
+# ==========================================
+# SHARED PANEL
+# ==========================================
+
+def _split_shift(name):
+    column, _, lag = name.rpartition("_shift_")
+    if column and lag.isdigit():
+        return column, int(lag)
+    return None, None
+
+
+def latest_snapshot(df, names):
+
+    latest = df.iloc[-1].to_dict()
+
+    for name in names:
+        column, lag = _split_shift(name)
+        if column is not None:
+            latest[name] = df[column].iloc[-1 - lag] if len(df) > lag else np.nan
+
+    return latest
+
+
+def window_start(scan_date, lookback_days):
+
+    if lookback_days is None:
+        return None
+
+    return (pd.Timestamp(scan_date) - timedelta(days=lookback_days)).strftime("%Y-%m-%d")
+
+
+def required_indicators(strategies):
+
+    names = []
+
+    for strategy in strategies:
+        for name in strategy.indicators:
+            column, _ = _split_shift(name)
+            names.append(column or name)
+
+    return list(dict.fromkeys(names))
+
+
+# ==========================================
+# SCAN
+# ==========================================
+
+def run_scan(strategy_names=None, symbols=None, start_date=None, scan_date=None):
+
+    if strategy_names is None:
+        strategy_names = list(STRATEGIES)
+    if symbols is None:
+        symbols = get_symbol_list()
+    if scan_date is None:
+        scan_date = datetime.today().strftime("%Y-%m-%d")
+
+    context = {"scan_date": scan_date}
+
+    strategies = [STRATEGIES[name] for name in strategy_names]
+    strategies = [s for s in strategies if s.prepare(context)]
+
+    if not strategies:
+        return pd.DataFrame(columns=SIGNAL_COLUMNS)
+
+    # Strategies with the same lookback share one indicator pass
+    windows = {}
+    for strategy in strategies:
+        windows.setdefault(window_start(scan_date, strategy.lookback_days), []).append(strategy)
+
+    # One load covering every window
+    load_start = None if None in windows else min(windows)
+    if start_date:
+        load_start = max(start_date, load_start) if load_start else start_date
+
+    universe = load_universe_data(symbols, load_start, scan_date)
+
+    rows = []
+
+    for symbol in symbols:
+
+        full = universe.get(symbol)
+        if full is None:
+            continue
+
+        # Sliced before any indicator columns are added
+        frames = {start: full if start is None else full.loc[start:].copy() for start in windows}
+
+        for start, group in windows.items():
+
+            df = frames[start]
+            group = [s for s in group if len(df) >= s.min_bars]
+            if not group:
+                continue
+
+            add_indicators(df, required_indicators(group), symbol=symbol)
+            latest = latest_snapshot(df, [name for s in group for name in s.indicators])
+
+            for strategy in group:
+                for signal in strategy.evaluate(symbol, latest, context):
+                    rows.append({"strategy": strategy.name, "symbol": symbol, **signal})
+
+    return pd.DataFrame(rows, columns=SIGNAL_COLUMNS)
+
+
+if __name__ == "__main__":
+
+    names = sys.argv[1:] or None
+
+    signals = run_scan(names)
+
+    print("\n===== COMBINED SCAN =====")
+
+    if signals.empty:
+        print("No signals today.")
+    else:
+        print(signals.to_string(index=False))
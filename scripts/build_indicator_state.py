@@ -0,0 +1,34 @@
+from datetime import datetime
+from services.db_data_loader import load_universe_data
+from services.upstox_data import load_stock_data
+from services.instrument_mapper import get_symbol_list
+from services.indicator_state import build_state, save_states
+
+START_DATE = "2015-01-01"
+END_DATE = datetime.today().strftime("%Y-%m-%d")
+
+NIFTY_KEY = "NSE_INDEX|Nifty 50"
+
+
+def main():
+
+    symbols = get_symbol_list()
+    states = {}
+
+    print("Loading:", len(symbols), "symbols")
+    universe = load_universe_data(symbols, START_DATE, END_DATE)
+
+    for symbol, df in universe.items():
+        states[symbol] = build_state(df)
+
+    nifty_df = load_stock_data(NIFTY_KEY, START_DATE, END_DATE)
+    if nifty_df is not None:
+        states[NIFTY_KEY] = build_state(nifty_df)
+
+    save_states(states)
+
+    print("Saved state for", len(states), "instruments")
+
+
+if __name__ == "__main__":
+    main()
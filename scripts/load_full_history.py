@@ -1,53 +1,48 @@
-from services.upstox_data import load_stock_data
-from services.instrument_mapper import get_symbol_list, get_instrument_key
-from sqlalchemy import text
-from config.database import engine
+from services.upstox_data import load_many
+from services.db_writer import store_prices
+from services.instrument_mapper import get_symbol_list, get_instrument_keys
+from services.instrumentation import instrumented_run
+from services.db_schema import migrate
 
 START_DATE = "2015-01-01"
 END_DATE = "2026-02-13"
 
-
-def store_to_db(symbol, df):
-
-    with engine.connect() as conn:
-        for _, row in df.iterrows():
-            conn.execute(text("""
-                INSERT INTO daily_prices 
-                (symbol, date, open, high, low, close, volume)
-                VALUES (:symbol, :date, :open, :high, :low, :close, :volume)
-                ON CONFLICT (symbol, date) DO NOTHING
-            """), {
-                "symbol": symbol,
-                "date": row.name.date(),
-                "open": float(row["open"]),
-                "high": float(row["high"]),
-                "low": float(row["low"]),
-                "close": float(row["close"]),
-                "volume": int(row["volume"])
-            })
-        conn.commit()
+BATCH_SIZE = 50
 
 
 def main():
 
+    migrate()
+
     symbols = get_symbol_list()
+    failed = []
 
-    for symbol in symbols:
+    for i in range(0, len(symbols), BATCH_SIZE):
 
-        print("Loading:", symbol)
+        batch = symbols[i:i + BATCH_SIZE]
+        print("Loading:", ", ".join(batch))
 
-        instrument_key = get_instrument_key(symbol)
+        keys = get_instrument_keys(batch)
 
-        if not instrument_key:
-            continue
+        fetched, failed_keys = load_many(keys.values(), START_DATE, END_DATE)
+        failed += [symbol for symbol, key in keys.items() if key in failed_keys]
 
-        df = load_stock_data(instrument_key, START_DATE, END_DATE)
+        frames = {
+            symbol: fetched.get(key)
+            for symbol, key in keys.items()
+            if fetched.get(key) is not None
+        }
 
-        if df is None or df.empty:
+        if not frames:
             continue
 
-        store_to_db(symbol, df)
+        counts = store_prices(frames)
+        print(f"  inserted {counts['inserted']}, skipped {counts['skipped']}")
+
+    if failed:
+        raise SystemExit(f"{len(failed)} symbols not loaded after failed requests: {', '.join(failed)}")
 
 
 if __name__ == "__main__":
-    main()
+    with instrumented_run("load-full-history"):
+        main()
@@ -0,0 +1,59 @@
+import argparse
+from services.db_schema import (
+    HASH_PARTITIONS, PARTITION_MODES, explain, maintain, migrate, schema_status
+)
+from services.instrument_mapper import get_symbol_list
+from services.price_cache import refresh_cache
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(prog="manage_db", description="daily_prices schema and maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_cmd = commands.add_parser("migrate", help="Apply pending schema migrations")
+    migrate_cmd.add_argument("--partition", choices=PARTITION_MODES, default=None,
+                             help="Partition a newly created daily_prices table")
+    migrate_cmd.add_argument("--hash-partitions", type=int, default=HASH_PARTITIONS)
+
+    commands.add_parser("status", help="Show applied and pending migrations")
+
+    maintain_cmd = commands.add_parser("maintain", help="ANALYZE, optionally VACUUM and CLUSTER")
+    maintain_cmd.add_argument("--vacuum", action="store_true")
+    maintain_cmd.add_argument("--cluster", action="store_true", help="Rewrite the table in (symbol, date) order")
+
+    commands.add_parser("explain", help="Show the plans of the per-symbol and per-date reads")
+
+    cache_cmd = commands.add_parser("cache", help="Refresh the memory-mapped price cache")
+    rebuild = cache_cmd.add_mutually_exclusive_group()
+    rebuild.add_argument("--full", action="store_true", help="Rebuild every symbol, after backfills or corrections")
+    rebuild.add_argument("--verify", action="store_true",
+                         help="Rebuild symbols whose row count differs from daily_prices")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "migrate":
+        applied = migrate(args.partition, args.hash_partitions)
+        print("Applied:", applied or "nothing, schema is up to date")
+
+    elif args.command == "status":
+        status = schema_status()
+        print("Applied:", status["applied"])
+        print("Pending:", status["pending"])
+        print("Partitioning:", status["partition"] or "none")
+
+    elif args.command == "maintain":
+        maintain(vacuum=args.vacuum, cluster=args.cluster)
+
+    elif args.command == "explain":
+        for name, plan in explain().items():
+            print(f"\n--- {name} ---")
+            print(plan)
+
+    elif args.command == "cache":
+        appended = refresh_cache(get_symbol_list(), full=args.full, verify=args.verify)
+        print("Cached rows written:", appended)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,30 @@
+import pandas as pd
 from datetime import datetime, timedelta
 from sqlalchemy import text
 from config.database import engine
-from services.upstox_data import load_stock_data
-from services.instrument_mapper import get_symbol_list, get_instrument_key
+from services.upstox_data import load_many, load_stock_data
+from services.db_writer import store_prices
+from services.db_data_loader import load_universe_data
+from services.instrument_mapper import get_symbol_list, get_instrument_keys
+from services.indicator_state import load_states, save_states, advance_from_frame, build_state
+from services.instrumentation import instrumented_run
 
+NIFTY_KEY = "NSE_INDEX|Nifty 50"
+STATE_START_DATE = "2015-01-01"     # same history as scripts/build_indicator_state.py
 
-def get_last_date(symbol):
-    with engine.connect() as conn:
-        result = conn.execute(text("""
-            SELECT MAX(date) FROM daily_prices
-            WHERE symbol = :symbol
-        """), {"symbol": symbol}).fetchone()
 
-    return result[0]
+def get_last_dates():
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT symbol, MAX(date) FROM daily_prices
+            GROUP BY symbol
+        """)).fetchall()
 
+    return {symbol: pd.Timestamp(last_date) for symbol, last_date in rows}
 
-def store_to_db(symbol, df):
 
-    with engine.connect() as conn:
-        for _, row in df.iterrows():
-            conn.execute(text("""
-                INSERT INTO daily_prices 
-                (symbol, date, open, high, low, close, volume)
-                VALUES (:symbol, :date, :open, :high, :low, :close, :volume)
-                ON CONFLICT (symbol, date) DO NOTHING
-            """), {
-                "symbol": symbol,
-                "date": row.name.date(),
-                "open": float(row["open"]),
-                "high": float(row["high"]),
-                "low": float(row["low"]),
-                "close": float(row["close"]),
-                "volume": int(row["volume"])
-            })
-        conn.commit()
+def _next_day(last_date):
+    return (pd.Timestamp(last_date) + timedelta(days=1)).strftime("%Y-%m-%d")
 
 
 def main():
@@ -42,28 +33,90 @@ def main():
 
     today = datetime.today().strftime("%Y-%m-%d")
 
-    for symbol in symbols:
+    last_dates = get_last_dates()
+    instrument_keys = get_instrument_keys(symbols)
+    states = load_states()
+
+    # Symbols missing the same range of days are fetched together
+    gaps = {}
 
-        print("Updating:", symbol)
+    for symbol in symbols:
 
-        last_date = get_last_date(symbol)
+        last_date = last_dates.get(symbol)
 
         if last_date is None:
-            print("No data found. Run full loader first.")
+            print(f"{symbol}: no data found. Run full loader first.")
             continue
 
-        # start_date = (last_date + timedelta(days=1)).strftime("%Y-%m-%d")
+        if symbol not in instrument_keys:
+            continue
+
+        start_date = _next_day(last_date)
 
-        instrument_key = get_instrument_key(symbol)
-        if not instrument_key:
+        if start_date > today:
             continue
-        df = load_stock_data(instrument_key, today, today)
 
-        if df is None or df.empty:
+        gaps.setdefault(start_date, []).append(symbol)
+
+    frames = {}
+    failed = []
+
+    for start_date, group in sorted(gaps.items()):
+
+        print(f"Updating {len(group)} symbols from {start_date} to {today}")
+
+        fetched, failed_keys = load_many([instrument_keys[s] for s in group], start_date, today)
+        failed += [s for s in group if instrument_keys[s] in failed_keys]
+
+        for symbol in group:
+            df = fetched.get(instrument_keys[symbol])
+            if df is not None and not df.empty:
+                frames[symbol] = df
+
+    counts = store_prices(frames)
+    print(f"Inserted {counts['inserted']}, skipped {counts['skipped']}")
+
+    # Roll the scanner indicator state forward by the new candles. A state
+    # that does not end where daily_prices ended before this run (a run
+    # that stored prices but died before saving state, a backfill) would
+    # skip or repeat bars, so it is rebuilt from daily_prices instead
+    stale = []
+
+    for symbol in symbols:
+
+        state = states.get(symbol)
+        if state is None or symbol not in last_dates:
             continue
 
-        store_to_db(symbol, df)
+        if state["last_date"] != last_dates[symbol].strftime("%Y-%m-%d"):
+            stale.append(symbol)
+        elif symbol in frames:
+            advance_from_frame(state, frames[symbol])
+
+    if stale:
+        print(f"Rebuilding indicator state for {len(stale)} symbols out of step with daily_prices:",
+              ", ".join(stale))
+        universe = load_universe_data(stale, STATE_START_DATE, today)
+        for symbol in stale:
+            if symbol in universe:
+                states[symbol] = build_state(universe[symbol])
+
+    nifty_state = states.get(NIFTY_KEY)
+    if nifty_state is not None:
+        start_date = _next_day(nifty_state["last_date"])
+        if start_date <= today:
+            nifty_df = load_stock_data(NIFTY_KEY, start_date, today)
+            if nifty_df is not None:
+                advance_from_frame(nifty_state, nifty_df)
+
+    save_states(states)
+
+    # Everything that did arrive is stored; the run still fails so a
+    # scheduler notices the symbols left behind
+    if failed:
+        raise SystemExit(f"{len(failed)} symbols not updated after failed requests: {', '.join(failed)}")
 
 
 if __name__ == "__main__":
-    main()
+    with instrumented_run("update-daily-data"):
+        main()
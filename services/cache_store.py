@@ -0,0 +1,117 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+CACHE_FILE = os.getenv("CACHE_DB_FILE", os.path.join("data", "cache.sqlite3"))
+MAX_ENTRIES = 20000
+
+
+# ==========================================
+# SQLITE KEY-VALUE CACHE
+# ==========================================
+#
+# JSON values grouped by namespace, with a per-read TTL and
+# least-recently-used eviction once MAX_ENTRIES is exceeded.
+
+class CacheStore:
+
+    def __init__(self, path=CACHE_FILE, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+
+        if not self._ready:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+            conn.commit()
+            self._ready = True
+
+        return conn
+
+    def get(self, namespace, key, ttl=None):
+        now = time.time()
+
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT value, created_at FROM cache WHERE namespace = ? AND key = ?",
+                    (namespace, key)
+                ).fetchone()
+
+                if row is None:
+                    return None
+
+                value, created_at = row
+
+                if ttl is not None and now - created_at > ttl:
+                    conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+                    conn.commit()
+                    return None
+
+                conn.execute(
+                    "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, namespace, key)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+        return json.loads(value)
+
+    def set(self, namespace, key, value):
+        now = time.time()
+
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value), now, now)
+                )
+
+                count = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+                if count > self.max_entries:
+                    conn.execute(
+                        "DELETE FROM cache WHERE rowid IN "
+                        "(SELECT rowid FROM cache ORDER BY accessed_at LIMIT ?)",
+                        (count - self.max_entries,)
+                    )
+
+                conn.commit()
+            finally:
+                conn.close()
+
+    def clear(self, namespace=None):
+        with self._lock:
+            conn = self._connect()
+            try:
+                if namespace is None:
+                    conn.execute("DELETE FROM cache")
+                else:
+                    conn.execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+                conn.commit()
+            finally:
+                conn.close()
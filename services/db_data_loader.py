@@ -1,8 +1,13 @@
 import pandas as pd
-from sqlalchemy import text
+from sqlalchemy import text, bindparam
 from config.database import engine
+from services.instrumentation import timed
 
 
+UNIVERSE_CHUNK_SIZE = 100
+
+
+@timed("db.load_stock_data")
 def load_stock_data(symbol, start_date=None, end_date=None):
 
     query = """
@@ -23,7 +28,7 @@ def load_stock_data(symbol, start_date=None, end_date=None):
         params["start_date"] = start_date
     if end_date:
         params["end_date"] = end_date
-        
+
     with engine.connect() as conn:
         df = pd.read_sql(text(query), conn, params=params)
 
@@ -34,3 +39,74 @@ def load_stock_data(symbol, start_date=None, end_date=None):
     df.set_index("date", inplace=True)
 
     return df
+
+
+# ==========================================
+# LOAD MANY SYMBOLS IN ONE QUERY
+# ==========================================
+
+@timed("db.load_universe_data")
+def load_universe_data(symbols, start_date=None, end_date=None, chunk_size=UNIVERSE_CHUNK_SIZE):
+
+    symbols = list(dict.fromkeys(symbols))
+
+    query = """
+        SELECT symbol, date, open, high, low, close, volume
+        FROM daily_prices
+        WHERE symbol IN :symbols
+    """
+
+    if start_date:
+        query += " AND date >= :start_date"
+    if end_date:
+        query += " AND date <= :end_date"
+
+    query += " ORDER BY symbol, date"
+
+    statement = text(query).bindparams(bindparam("symbols", expanding=True))
+
+    loaded = {}
+
+    with engine.connect().execution_options(stream_results=True) as conn:
+        for i in range(0, len(symbols), chunk_size):
+
+            params = {"symbols": symbols[i:i + chunk_size]}
+            if start_date:
+                params["start_date"] = start_date
+            if end_date:
+                params["end_date"] = end_date
+
+            df = pd.read_sql(statement, conn, params=params)
+
+            if df.empty:
+                continue
+
+            df["date"] = pd.to_datetime(df["date"])
+
+            for symbol, group in df.groupby("symbol", sort=False):
+                loaded[symbol] = group.drop(columns="symbol").set_index("date")
+
+    # Keep the caller's symbol order, backtests depend on it for entry priority
+    return {symbol: loaded[symbol] for symbol in symbols if symbol in loaded}
+
+
+# Rows per symbol, for checking the price cache against the table
+@timed("db.count_rows")
+def count_rows(symbols, chunk_size=UNIVERSE_CHUNK_SIZE):
+
+    symbols = list(dict.fromkeys(symbols))
+
+    statement = text("""
+        SELECT symbol, COUNT(*) FROM daily_prices
+        WHERE symbol IN :symbols
+        GROUP BY symbol
+    """).bindparams(bindparam("symbols", expanding=True))
+
+    counts = {}
+
+    with engine.connect() as conn:
+        for i in range(0, len(symbols), chunk_size):
+            for symbol, rows in conn.execute(statement, {"symbols": symbols[i:i + chunk_size]}):
+                counts[symbol] = rows
+
+    return counts
@@ -0,0 +1,226 @@
+from datetime import datetime
+from sqlalchemy import text
+from config.database import engine
+
+
+SCHEMA_TABLE = "schema_migrations"
+PARTITION_MODES = ["year", "hash"]
+PARTITION_START_YEAR = 2015     # first year load_full_history fetches
+HASH_PARTITIONS = 8
+BRIN_PAGES_PER_RANGE = 32
+
+# The two reads the loaders issue; explain() checks both use an index
+READ_QUERIES = {
+    "symbol history": """
+        SELECT date, open, high, low, close, volume FROM daily_prices
+        WHERE symbol = 'RELIANCE' AND date >= '2024-01-01' ORDER BY date
+    """,
+    "one date, all symbols": """
+        SELECT symbol, open, high, low, close, volume FROM daily_prices
+        WHERE date = '2024-06-03'
+    """,
+}
+
+
+# ==========================================
+# daily_prices
+# ==========================================
+#
+# The primary key (symbol, date) is what store_prices' ON CONFLICT and
+# the per-symbol ORDER BY date range reads rely on. SQLite stores the
+# table WITHOUT ROWID, i.e. clustered on that key; Postgres keeps heap
+# order, so maintain(cluster=True) rewrites it in key order.
+#
+# Partitioning only applies when the table is created here; an existing
+# table is adopted as it is.
+
+def _columns():
+    return """
+        symbol TEXT NOT NULL,
+        date DATE NOT NULL,
+        open DOUBLE PRECISION,
+        high DOUBLE PRECISION,
+        low DOUBLE PRECISION,
+        close DOUBLE PRECISION,
+        volume BIGINT,
+        PRIMARY KEY (symbol, date)
+    """
+
+
+def _partition_strategy(conn):
+
+    row = conn.execute(text("""
+        SELECT partstrat FROM pg_partitioned_table
+        WHERE partrelid = to_regclass('daily_prices')
+    """)).fetchone()
+
+    return {"r": "year", "h": "hash"}.get(row[0]) if row else None
+
+
+def ensure_year_partitions(conn, through_year=None):
+
+    through_year = through_year or datetime.today().year + 1
+
+    for year in range(PARTITION_START_YEAR, through_year + 1):
+        conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS daily_prices_{year} PARTITION OF daily_prices
+            FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')
+        """))
+
+
+def _create_daily_prices(conn, options):
+
+    if conn.dialect.name != "postgresql":
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS daily_prices ({_columns()}) WITHOUT ROWID"))
+        return
+
+    partition = options.get("partition")
+    exists = conn.execute(text("SELECT to_regclass('daily_prices')")).scalar() is not None
+
+    if exists:
+        if partition and _partition_strategy(conn) != partition:
+            print(f"daily_prices already exists, not repartitioning it by {partition}")
+        return
+
+    if partition is None:
+        conn.execute(text(f"CREATE TABLE daily_prices ({_columns()})"))
+
+    elif partition == "year":
+        conn.execute(text(f"CREATE TABLE daily_prices ({_columns()}) PARTITION BY RANGE (date)"))
+        ensure_year_partitions(conn)
+        # Catches rows outside the pre-created years
+        conn.execute(text("CREATE TABLE daily_prices_default PARTITION OF daily_prices DEFAULT"))
+
+    elif partition == "hash":
+        count = options.get("hash_partitions", HASH_PARTITIONS)
+        conn.execute(text(f"CREATE TABLE daily_prices ({_columns()}) PARTITION BY HASH (symbol)"))
+        for remainder in range(count):
+            conn.execute(text(f"""
+                CREATE TABLE daily_prices_h{remainder} PARTITION OF daily_prices
+                FOR VALUES WITH (MODULUS {count}, REMAINDER {remainder})
+            """))
+
+    else:
+        raise ValueError(f"Unknown partition mode: {partition}")
+
+
+# The key serves per-symbol reads; a date-first btree serves one date
+# across all symbols. BRIN stays tiny and prunes date ranges where rows
+# arrive in date order (the daily update appends, year partitions), but
+# on its own it cannot serve a point date over a symbol-ordered heap.
+def _add_date_indexes(conn, options):
+
+    conn.execute(text("CREATE INDEX IF NOT EXISTS daily_prices_date_symbol ON daily_prices (date, symbol)"))
+
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(f"""
+            CREATE INDEX IF NOT EXISTS daily_prices_date_brin ON daily_prices
+            USING brin (date) WITH (pages_per_range = {BRIN_PAGES_PER_RANGE}, autosummarize = on)
+        """))
+
+
+# Append only: applied versions are never edited, changes get a new entry
+MIGRATIONS = [
+    (1, "create daily_prices", _create_daily_prices),
+    (2, "date indexes", _add_date_indexes),
+]
+
+
+# ==========================================
+# MIGRATE
+# ==========================================
+
+def applied_versions(conn):
+
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {SCHEMA_TABLE} (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        )
+    """))
+
+    return {row[0] for row in conn.execute(text(f"SELECT version FROM {SCHEMA_TABLE}"))}
+
+
+def migrate(partition=None, hash_partitions=HASH_PARTITIONS, engine=engine):
+
+    options = {"partition": partition, "hash_partitions": hash_partitions}
+    applied = []
+
+    with engine.begin() as conn:
+
+        done = applied_versions(conn)
+
+        for version, name, apply in MIGRATIONS:
+
+            if version in done:
+                continue
+
+            print(f"Applying {version}: {name}")
+            apply(conn, options)
+
+            conn.execute(
+                text(f"INSERT INTO {SCHEMA_TABLE} (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                {"version": version, "name": name, "applied_at": datetime.now()}
+            )
+            applied.append(version)
+
+    return applied
+
+
+def schema_status(engine=engine):
+
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+        partition = _partition_strategy(conn) if conn.dialect.name == "postgresql" else None
+
+    return {
+        "applied": sorted(done),
+        "pending": [version for version, _, _ in MIGRATIONS if version not in done],
+        "partition": partition,
+    }
+
+
+# ==========================================
+# MAINTENANCE
+# ==========================================
+#
+# VACUUM cannot run inside a transaction, so this uses an autocommit
+# connection. CLUSTER takes an exclusive lock and Postgres does not keep
+# the order up, so run it after bulk loads, not after every update.
+
+def maintain(vacuum=False, cluster=False, engine=engine):
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+
+        postgres = conn.dialect.name == "postgresql"
+
+        if postgres and _partition_strategy(conn) == "year":
+            ensure_year_partitions(conn)
+
+        if cluster and postgres:
+            print("Clustering daily_prices on its primary key")
+            conn.execute(text("CLUSTER daily_prices USING daily_prices_pkey"))
+
+        if vacuum:
+            print("Vacuuming daily_prices")
+            conn.execute(text("VACUUM ANALYZE daily_prices" if postgres else "VACUUM"))
+
+        print("Analyzing daily_prices")
+        conn.execute(text("ANALYZE daily_prices"))
+
+
+def explain(engine=engine):
+
+    plans = {}
+
+    with engine.connect() as conn:
+
+        prefix = "EXPLAIN" if conn.dialect.name == "postgresql" else "EXPLAIN QUERY PLAN"
+
+        for name, query in READ_QUERIES.items():
+            rows = conn.execute(text(f"{prefix} {query}")).fetchall()
+            plans[name] = "\n".join(str(row[-1]) for row in rows)
+
+    return plans
@@ -0,0 +1,130 @@
+import csv
+import io
+import pandas as pd
+from sqlalchemy import text
+from config.database import engine
+from services.instrumentation import timed
+
+
+STAGING_TABLE = "daily_prices_staging"
+PRICE_COLUMNS = ["symbol", "date", "open", "high", "low", "close", "volume"]
+INSERT_BATCH_SIZE = 5000
+
+# Postgres drivers store_prices can COPY through; anything else falls
+# back to batched INSERTs
+COPY_DRIVERS = {"psycopg2", "psycopg"}
+
+
+# ==========================================
+# ROWS
+# ==========================================
+
+def _price_rows(frames):
+
+    parts = []
+
+    for symbol, df in frames.items():
+
+        if df is None or df.empty:
+            continue
+
+        part = df[["open", "high", "low", "close", "volume"]].astype(float)
+        part["volume"] = part["volume"].astype("int64")
+        part.insert(0, "date", pd.DatetimeIndex(df.index).date)
+        part.insert(0, "symbol", symbol)
+
+        parts.append(part)
+
+    if not parts:
+        return pd.DataFrame(columns=PRICE_COLUMNS)
+
+    rows = pd.concat(parts, ignore_index=True)
+
+    return rows.drop_duplicates(subset=["symbol", "date"], keep="first")
+
+
+# ==========================================
+# STAGING LOADERS
+# ==========================================
+
+# psycopg 3 streams through cursor.copy(), psycopg2 through copy_expert
+def _copy_rows(conn, rows):
+
+    buffer = io.StringIO()
+    rows.to_csv(buffer, index=False, header=False, quoting=csv.QUOTE_MINIMAL)
+
+    sql = f"COPY {STAGING_TABLE} ({', '.join(PRICE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+    raw = conn.connection.driver_connection
+    with raw.cursor() as cursor:
+        if conn.dialect.driver == "psycopg":
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+        else:
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+
+
+def _insert_rows(conn, rows):
+
+    statement = text(f"""
+        INSERT INTO {STAGING_TABLE} ({', '.join(PRICE_COLUMNS)})
+        VALUES (:symbol, :date, :open, :high, :low, :close, :volume)
+    """)
+
+    records = rows.to_dict("records")
+
+    for i in range(0, len(records), INSERT_BATCH_SIZE):
+        conn.execute(statement, records[i:i + INSERT_BATCH_SIZE])
+
+
+def _can_copy(conn):
+    return conn.dialect.name == "postgresql" and conn.dialect.driver in COPY_DRIVERS
+
+
+# ==========================================
+# BULK UPSERT
+# ==========================================
+
+@timed("db.store_prices")
+def store_prices(frames, use_copy=True):
+
+    rows = _price_rows(frames)
+
+    if rows.empty:
+        return {"inserted": 0, "skipped": 0}
+
+    with engine.begin() as conn:
+
+        conn.execute(text(f"""
+            CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+                symbol TEXT,
+                date DATE,
+                open DOUBLE PRECISION,
+                high DOUBLE PRECISION,
+                low DOUBLE PRECISION,
+                close DOUBLE PRECISION,
+                volume BIGINT
+            )
+        """))
+        conn.execute(text(f"DELETE FROM {STAGING_TABLE}"))
+
+        if use_copy and _can_copy(conn):
+            print(f"Staging {len(rows)} rows with COPY ({conn.dialect.driver})")
+            _copy_rows(conn, rows)
+        else:
+            print(f"Staging {len(rows)} rows with INSERT ({conn.dialect.name}+{conn.dialect.driver})")
+            _insert_rows(conn, rows)
+
+        # "WHERE true" keeps SQLite from reading ON CONFLICT as a join clause
+        result = conn.execute(text(f"""
+            INSERT INTO daily_prices ({', '.join(PRICE_COLUMNS)})
+            SELECT {', '.join(PRICE_COLUMNS)} FROM {STAGING_TABLE}
+            WHERE true
+            ON CONFLICT (symbol, date) DO NOTHING
+        """))
+
+        inserted = result.rowcount
+        conn.execute(text(f"DELETE FROM {STAGING_TABLE}"))
+
+    return {"inserted": inserted, "skipped": len(rows) - inserted}
@@ -0,0 +1,227 @@
+import json
+import math
+import os
+
+
+STATE_FILE = os.getenv("INDICATOR_STATE_FILE", os.path.join("data", "indicator_state.json"))
+
+EMA_SPANS = [50, 200]
+EMA_50_LOOKBACK = 5
+HIGH_WINDOW = 20
+LOW_WINDOWS = [10, 7]
+VOLUME_WINDOW = 20
+ATR_PERIOD = 14
+ATR_MEAN_WINDOW = 50
+RSI_PERIOD = 14
+
+NAN = float("nan")
+
+
+# ==========================================
+# ACCUMULATORS
+# ==========================================
+#
+# EMAs follow the same recursion as pandas' ewm so a state built bar by
+# bar matches the full-history columns from services.indicators. Like
+# ewm's default ignore_na=False, a NaN bar still decays the old weight.
+#
+# A state is built from the full stored history, while run_daily_scan
+# recomputes over its LOOKBACK_DAYS window. The EMAs therefore start
+# from different points and can differ slightly (mostly ema_200), so a
+# --state scan and a windowed scan may disagree on bars sitting right
+# at a threshold. Rolling windows and RSI after warm-up agree exactly.
+
+def _new_ewm():
+    return {"weighted": NAN, "old_wt": 1.0}
+
+
+def _ewm_step(acc, value, alpha, adjust):
+
+    weighted = acc["weighted"]
+    is_observation = value == value
+    new_wt = 1.0 if adjust else alpha
+
+    if weighted == weighted:
+        acc["old_wt"] *= 1.0 - alpha
+        if is_observation:
+            if weighted != value:
+                weighted = ((acc["old_wt"] * weighted) + (new_wt * value)) / (acc["old_wt"] + new_wt)
+            if adjust:
+                acc["old_wt"] += new_wt
+            else:
+                acc["old_wt"] = 1.0
+    elif is_observation:
+        weighted = value
+
+    acc["weighted"] = weighted
+    return weighted
+
+
+def _push(buffer, value, size):
+    buffer.append(value)
+    del buffer[:-size]
+
+
+def _window(buffer, size):
+    # Rolling windows need a full set of non-NaN values, as in pandas
+    values = buffer[-size:]
+    if len(values) < size or any(v != v for v in values):
+        return None
+    return values
+
+
+def _window_max(buffer, size):
+    values = _window(buffer, size)
+    return NAN if values is None else max(values)
+
+
+def _window_min(buffer, size):
+    values = _window(buffer, size)
+    return NAN if values is None else min(values)
+
+
+def _window_mean(buffer, size):
+    values = _window(buffer, size)
+    return NAN if values is None else math.fsum(values) / size
+
+
+def _divide(a, b):
+    if b == 0:
+        if a == 0 or a != a:
+            return NAN
+        return math.copysign(math.inf, a)
+    return a / b
+
+
+# ==========================================
+# STATE
+# ==========================================
+
+def new_state():
+    return {
+        "last_date": None,
+        "bars": 0,
+        "prev_close": NAN,
+        "ema": {str(span): _new_ewm() for span in EMA_SPANS},
+        "rsi_up": _new_ewm(),
+        "rsi_down": _new_ewm(),
+        "ema_50_history": [],
+        "highs": [],
+        "lows": [],
+        "volumes": [],
+        "true_ranges": [],
+        "atrs": [],
+        "latest": None,
+    }
+
+
+def advance_state(state, date, bar):
+
+    close = float(bar["close"])
+    high = float(bar["high"])
+    low = float(bar["low"])
+    volume = float(bar["volume"])
+    prev_close = state["prev_close"]
+
+    latest = {
+        "date": date,
+        "open": float(bar["open"]),
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": volume,
+    }
+
+    # Breakout levels exclude the current bar (shift(1))
+    latest["hh_20"] = _window_max(state["highs"], HIGH_WINDOW)
+    for window in LOW_WINDOWS:
+        latest[f"ll_{window}"] = _window_min(state["lows"], window)
+
+    _push(state["highs"], high, HIGH_WINDOW)
+    _push(state["lows"], low, max(LOW_WINDOWS))
+    _push(state["volumes"], volume, VOLUME_WINDOW)
+    latest["vol_ma_20"] = _window_mean(state["volumes"], VOLUME_WINDOW)
+
+    for span in EMA_SPANS:
+        latest[f"ema_{span}"] = _ewm_step(state["ema"][str(span)], close, 2.0 / (span + 1.0), adjust=True)
+
+    _push(state["ema_50_history"], latest["ema_50"], EMA_50_LOOKBACK + 1)
+    history = state["ema_50_history"]
+    latest["ema_50_shift_5"] = history[0] if len(history) > EMA_50_LOOKBACK else NAN
+
+    # ATR
+    if prev_close == prev_close:
+        true_range = max(high - low, max(abs(high - prev_close), abs(low - prev_close)))
+    else:
+        true_range = NAN
+    _push(state["true_ranges"], true_range, ATR_PERIOD)
+    latest["atr_14"] = _window_mean(state["true_ranges"], ATR_PERIOD)
+    _push(state["atrs"], latest["atr_14"], ATR_MEAN_WINDOW)
+    latest["atr_mean_50"] = _window_mean(state["atrs"], ATR_MEAN_WINDOW)
+
+    # RSI (Wilder smoothing, adjust=False)
+    delta = close - prev_close
+    alpha = 1.0 / RSI_PERIOD
+    up = _ewm_step(state["rsi_up"], max(delta, 0.0) if delta == delta else NAN, alpha, adjust=False)
+    down = _ewm_step(state["rsi_down"], max(-delta, 0.0) if delta == delta else NAN, alpha, adjust=False)
+    latest["rsi"] = 100 - _divide(100, 1 + _divide(up, down))
+
+    state["prev_close"] = close
+    state["last_date"] = date
+    state["bars"] += 1
+    latest["bars"] = state["bars"]
+    state["latest"] = latest
+
+    return latest
+
+
+def advance_from_frame(state, df):
+
+    advanced = 0
+
+    for date, bar in df.iterrows():
+
+        date = date.strftime("%Y-%m-%d")
+
+        if state["last_date"] is not None and date <= state["last_date"]:
+            continue
+
+        advance_state(state, date, bar)
+        advanced += 1
+
+    return advanced
+
+
+def build_state(df):
+
+    state = new_state()
+    advance_from_frame(state, df)
+
+    return state
+
+
+# ==========================================
+# PERSISTENCE
+# ==========================================
+
+def load_states(path=STATE_FILE):
+
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_states(states, path=STATE_FILE):
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = path + ".tmp"
+
+    with open(tmp_path, "w") as f:
+        json.dump(states, f)
+
+    os.replace(tmp_path, path)
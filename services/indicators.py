@@ -0,0 +1,162 @@
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from services.instrumentation import count, timed
+
+
+MAX_CACHE_ENTRIES = 2048
+
+# (symbol, indicator name, data version) -> Series, least recently used first
+_cache = OrderedDict()
+
+
+# ==========================================
+# INDICATOR MATH
+# ==========================================
+#
+# Every function works on a Series or column-wise on a wide
+# date x symbol DataFrame.
+
+def ema(close, span):
+    return close.ewm(span=span).mean()
+
+
+def sma(values, window):
+    return values.rolling(window).mean()
+
+
+def highest_high(high, window):
+    return high.rolling(window).max().shift(1)
+
+
+def lowest_low(low, window):
+    return low.rolling(window).min().shift(1)
+
+
+def true_range(high, low, close):
+    prev_close = close.shift(1)
+    return np.maximum(
+        high - low,
+        np.maximum(
+            abs(high - prev_close),
+            abs(low - prev_close)
+        )
+    )
+
+
+def atr(high, low, close, period=14):
+    return true_range(high, low, close).rolling(period).mean()
+
+
+@timed("indicators.rsi")
+def rsi(close, period=14):
+    delta = close.diff()
+    up = delta.clip(lower=0)
+    down = -delta.clip(upper=0)
+    ema_up = up.ewm(com=period - 1, adjust=False).mean()
+    ema_down = down.ewm(com=period - 1, adjust=False).mean()
+    rs = ema_up / ema_down
+    return 100 - 100 / (1 + rs)
+
+
+# ==========================================
+# NAMED INDICATORS
+# ==========================================
+#
+# Column names used across the scanners and backtests, e.g. "ema_200",
+# "hh_20", "ll_7", "vol_ma_20", "atr_14", "atr_mean_50" and "rsi".
+
+INDICATORS = {
+    "ema": lambda df, n, version, symbol: ema(df["close"], n),
+    "hh": lambda df, n, version, symbol: highest_high(df["high"], n),
+    "ll": lambda df, n, version, symbol: lowest_low(df["low"], n),
+    "vol_ma": lambda df, n, version, symbol: sma(df["volume"], n),
+    "atr": lambda df, n, version, symbol: atr(df["high"], df["low"], df["close"], n),
+    "atr_mean": lambda df, n, version, symbol: sma(
+        get_indicator(df, "atr_14", symbol=symbol, version=version), n
+    ),
+    "rsi": lambda df, n, version, symbol: rsi(df["close"], n),
+}
+
+DEFAULT_PERIODS = {
+    "rsi": 14,
+}
+
+
+def _parse_name(name):
+
+    if name in INDICATORS:
+        return name, DEFAULT_PERIODS[name]
+
+    prefix, _, period = name.rpartition("_")
+
+    if prefix not in INDICATORS or not period.isdigit():
+        raise ValueError(f"Unknown indicator: {name}")
+
+    return prefix, int(period)
+
+
+def data_version(df):
+
+    columns = [c for c in ["open", "high", "low", "close", "volume"] if c in df.columns]
+
+    if df.empty:
+        return (0,)
+
+    digest = int(pd.util.hash_pandas_object(df[columns], index=True).sum())
+
+    return (len(df), df.index[0], df.index[-1], digest)
+
+
+# ==========================================
+# MEMOIZED ACCESS
+# ==========================================
+
+def get_indicator(df, name, symbol=None, version=None):
+
+    prefix, period = _parse_name(name)
+
+    if symbol is None:
+        return INDICATORS[prefix](df, period, version, symbol)
+
+    if version is None:
+        version = data_version(df)
+
+    key = (symbol, name, version)
+
+    if key in _cache:
+        _cache.move_to_end(key)
+        count("indicators.cache_hits")
+        return _cache[key]
+
+    count("indicators.cache_misses")
+
+    values = INDICATORS[prefix](df, period, version, symbol)
+
+    _cache[key] = values
+    if len(_cache) > MAX_CACHE_ENTRIES:
+        _cache.popitem(last=False)
+
+    return values
+
+
+@timed("indicators.add_indicators")
+def add_indicators(df, names, symbol=None):
+
+    version = data_version(df) if symbol is not None else None
+
+    for name in names:
+        df[name] = get_indicator(df, name, symbol=symbol, version=version)
+
+    return df
+
+
+# Per symbol over its own bars, so windows skip missing sessions exactly
+# as they do on the single-symbol frames
+@timed("indicators.add_panel_indicators")
+def add_panel_indicators(panel, names):
+    return panel.map_symbols(lambda symbol, df: add_indicators(df, names, symbol=symbol), names)
+
+
+def clear_indicator_cache():
+    _cache.clear()
@@ -1,19 +1,62 @@
+import os
+import threading
 import pandas as pd
 
 INSTRUMENT_FILE = "stock_list.csv"
 
-def get_instrument_key(symbol):
+# Process-wide index, rebuilt only when the file's mtime changes
+_index = {"path": None, "mtime": None, "keys": {}, "symbols": []}
+_index_lock = threading.Lock()
+
+
+def _load_index():
+
+    mtime = os.path.getmtime(INSTRUMENT_FILE)
+
+    with _index_lock:
+        if _index["path"] != INSTRUMENT_FILE or _index["mtime"] != mtime:
 
-    df = pd.read_csv(INSTRUMENT_FILE)
+            df = pd.read_csv(INSTRUMENT_FILE, usecols=["tradingsymbol", "instrument_key"])
 
-    row = df[df["tradingsymbol"] == symbol]
+            keys = {}
+            for symbol, key in zip(df["tradingsymbol"], df["instrument_key"]):
+                keys.setdefault(symbol, key)
 
-    if row.empty:
+            _index["path"] = INSTRUMENT_FILE
+            _index["mtime"] = mtime
+            _index["keys"] = keys
+            # stock_list.csv repeats a few symbols (CHOLAFIN, MOTHERSON,
+            # M&MFIN); the first row wins, in file order
+            _index["symbols"] = list(keys)
+
+        return _index
+
+
+def get_instrument_key(symbol):
+
+    key = _load_index()["keys"].get(symbol)
+
+    if key is None:
         print(f"Instrument not found for {symbol}")
         return None
 
-    return row.iloc[0]["instrument_key"]
+    return key
+
+
+def get_instrument_keys(symbols):
+
+    keys = _load_index()["keys"]
+    found = {}
+
+    for symbol in symbols:
+        key = keys.get(symbol)
+        if key is None:
+            print(f"Instrument not found for {symbol}")
+            continue
+        found[symbol] = key
+
+    return found
+
 
 def get_symbol_list():
-    df = pd.read_csv(INSTRUMENT_FILE)
-    return df["tradingsymbol"].tolist()
+    return list(_load_index()["symbols"])
@@ -0,0 +1,210 @@
+import contextlib
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+
+TIMING_DIR = os.getenv("TIMING_DIR", os.path.join("data", "timing"))
+PROFILER = os.getenv("PROFILER")  # "cprofile" or "pyinstrument"
+
+_lock = threading.Lock()
+_spans = {}
+_counters = {}
+
+
+# ==========================================
+# SPANS AND COUNTERS
+# ==========================================
+#
+# Process-wide totals, cheap enough to stay on in every run. Spans nest
+# freely and record wall time, so overlapping async/threaded spans each
+# count their own duration.
+
+def _record(name, elapsed):
+    with _lock:
+        stats = _spans.get(name)
+        if stats is None:
+            _spans[name] = {"calls": 1, "total_s": elapsed, "min_s": elapsed, "max_s": elapsed}
+        else:
+            stats["calls"] += 1
+            stats["total_s"] += elapsed
+            stats["min_s"] = min(stats["min_s"], elapsed)
+            stats["max_s"] = max(stats["max_s"], elapsed)
+
+
+@contextlib.contextmanager
+def span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - start)
+
+
+def timed(name):
+
+    def decorate(fn):
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    _record(name, time.perf_counter() - start)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorate
+
+
+def count(name, n=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+
+
+# ==========================================
+# REPORTS
+# ==========================================
+
+def report():
+
+    with _lock:
+        spans = {name: dict(stats) for name, stats in _spans.items()}
+        counters = dict(_counters)
+
+    for stats in spans.values():
+        stats["mean_s"] = stats["total_s"] / stats["calls"]
+
+    return {
+        "spans": dict(sorted(spans.items(), key=lambda item: -item[1]["total_s"])),
+        "counters": dict(sorted(counters.items())),
+    }
+
+
+def print_report(data=None):
+
+    data = data or report()
+
+    print("\n===== TIMING =====")
+    print(f"{'span':<36} {'calls':>7} {'total s':>10} {'mean ms':>10} {'max ms':>10}")
+
+    for name, stats in data["spans"].items():
+        print(
+            f"{name:<36} {stats['calls']:>7} {stats['total_s']:>10.3f} "
+            f"{stats['mean_s'] * 1000:>10.2f} {stats['max_s'] * 1000:>10.2f}"
+        )
+
+    if data["counters"]:
+        print("\n--- COUNTERS ---")
+        for name, value in data["counters"].items():
+            print(f"{name:<36} {value:>7}")
+
+
+def write_report(path, data=None):
+
+    data = data or report()
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+# ==========================================
+# PROFILER HOOK
+# ==========================================
+
+@contextlib.contextmanager
+def profile(kind="cprofile", output=None):
+
+    if kind is None:
+        yield
+        return
+
+    if kind == "pyinstrument":
+        from pyinstrument import Profiler
+
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            if output:
+                with open(output, "w") as f:
+                    f.write(profiler.output_html())
+            else:
+                print(profiler.output_text(unicode=True))
+        return
+
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        if output:
+            profiler.dump_stats(output)
+        else:
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+
+# ==========================================
+# WHOLE RUNS
+# ==========================================
+#
+# Wraps a script or CLI command: resets the totals, optionally profiles,
+# then prints the summary and writes <timing_dir>/<name>-<stamp>.json
+# (plus .prof / .html when profiling).
+
+@contextlib.contextmanager
+def instrumented_run(name, profiler=PROFILER, timing_dir=TIMING_DIR):
+
+    reset()
+
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    base = os.path.join(timing_dir, f"{name}-{stamp}")
+
+    profile_output = None
+    if profiler:
+        os.makedirs(timing_dir, exist_ok=True)
+        profile_output = base + (".html" if profiler == "pyinstrument" else ".prof")
+
+    try:
+        with profile(profiler, profile_output):
+            with span(f"run.{name}"):
+                yield
+    finally:
+        data = report()
+        print_report(data)
+        write_report(base + ".json", data)
+        print(f"Timing report: {base}.json")
+        if profile_output:
+            print(f"Profile: {profile_output}")
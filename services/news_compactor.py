@@ -0,0 +1,199 @@
+import re
+import zlib
+import numpy as np
+from services.news_fetcher import format_for_gpt
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+TOKEN_BUDGET = 1500            # tokens for the formatted news block
+DUPLICATE_THRESHOLD = 0.7      # estimated Jaccard similarity
+SHINGLE_SIZE = 5               # words
+NUM_PERMUTATIONS = 64
+MIN_SENTENCE_TOKENS = 8        # truncated articles keep at least this much
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(1, _MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, _MERSENNE_PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+
+# Matched per sentence. Words that also occur in real news ("copyright
+# case", "cookies maker", "subscribe to the IPO") are anchored to the
+# sentence start or to their site-chrome phrasing.
+BOILERPLATE_PATTERNS = [
+    r"^subscribe\b",
+    r"subscribe to our",
+    r"sign up for our",
+    r"^sign up\b",
+    r"our newsletter",
+    r"all rights reserved",
+    r"^copyright\b",
+    r"^\u00a9",
+    r"^disclaimer\b",
+    r"click here",
+    r"follow us on",
+    r"download the .* app",
+    r"^catch all the",
+    r"we use cookies",
+    r"cookie policy",
+    r"^advertisement$",
+    r"^also read\b",
+    r"views and recommendations .* are those of",
+]
+_BOILERPLATE = re.compile("|".join(BOILERPLATE_PATTERNS), re.IGNORECASE)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+_encoding = None
+
+
+# ==========================================
+# TOKENS
+# ==========================================
+
+def count_tokens(text):
+
+    global _encoding
+
+    if tiktoken is None:
+        return (len(text) + 3) // 4
+
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("o200k_base")
+
+    return len(_encoding.encode(text))
+
+
+# ==========================================
+# BOILERPLATE
+# ==========================================
+
+def strip_boilerplate(text):
+
+    sentences = _SENTENCE_END.split(text)
+    kept = [s for s in sentences if s and not _BOILERPLATE.search(s.strip())]
+
+    return " ".join(kept)
+
+
+# ==========================================
+# NEAR-DUPLICATES (MINHASH)
+# ==========================================
+
+def _minhash(text):
+
+    words = _WORD.findall(text.lower())
+
+    if len(words) < SHINGLE_SIZE:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+    hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in shingles], dtype=np.uint64)
+
+    permuted = (hashes[:, None] * _PERM_A[None, :] + _PERM_B[None, :]) % _MERSENNE_PRIME
+
+    return permuted.min(axis=0)
+
+
+def similarity(signature_a, signature_b):
+    return float(np.mean(signature_a == signature_b))
+
+
+# ==========================================
+# RELEVANCE
+# ==========================================
+
+def relevance(article, terms):
+
+    title = article["title"].lower()
+    content = article["content"].lower()
+
+    score = 0.0
+    for term in terms:
+        term = term.lower()
+        score += 3 * title.count(term) + content.count(term)
+
+    return score
+
+
+# ==========================================
+# COMPACTION
+# ==========================================
+
+def _truncate_to_budget(text, budget):
+
+    kept = []
+    used = 0
+
+    for sentence in _SENTENCE_END.split(text):
+        tokens = count_tokens(sentence) + 1
+        if used + tokens > budget:
+            break
+        kept.append(sentence)
+        used += tokens
+
+    return " ".join(kept)
+
+
+def compact_articles(symbol, articles, token_budget=TOKEN_BUDGET, aliases=()):
+
+    report = {
+        "tokens_before": count_tokens(format_for_gpt(symbol, articles)) if articles else 0,
+        "tokens_after": 0,
+        "tokens_saved": 0,
+        "duplicates_dropped": 0,
+        "articles_truncated": 0,
+    }
+
+    if not articles:
+        return [], report
+
+    cleaned = [{**a, "content": strip_boilerplate(a["content"])} for a in articles]
+
+    # Most relevant first, original order breaks ties
+    terms = [symbol, *aliases]
+    ranked = sorted(cleaned, key=lambda a: -relevance(a, terms))
+
+    kept = []
+    signatures = []
+
+    for article in ranked:
+        signature = _minhash(article["title"] + " " + article["content"])
+
+        if any(similarity(signature, s) >= DUPLICATE_THRESHOLD for s in signatures):
+            report["duplicates_dropped"] += 1
+            continue
+
+        kept.append(article)
+        signatures.append(signature)
+
+    compacted = []
+    remaining = token_budget - count_tokens(format_for_gpt(symbol, []))
+
+    for article in kept:
+
+        header = {**article, "index": len(compacted) + 1, "content": ""}
+        overhead = count_tokens(format_for_gpt(symbol, [header])) - count_tokens(format_for_gpt(symbol, []))
+        content_budget = remaining - overhead
+
+        if content_budget < MIN_SENTENCE_TOKENS:
+            break
+
+        content = article["content"]
+        if count_tokens(content) > content_budget:
+            content = _truncate_to_budget(content, content_budget)
+            report["articles_truncated"] += 1
+            if not content:
+                break
+
+        compacted.append({**header, "content": content})
+        remaining -= overhead + count_tokens(content)
+
+    report["tokens_after"] = count_tokens(format_for_gpt(symbol, compacted))
+    report["tokens_saved"] = report["tokens_before"] - report["tokens_after"]
+
+    return compacted, report
@@ -1,10 +1,65 @@
-import feedparser
+import asyncio
+import base64
+import re
+import threading
+import requests
 import urllib.parse
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from services.cache_store import CacheStore
+from services.instrumentation import count, timed
 
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+
+MAX_PAGES = 4
+ARTICLE_DEADLINE = 20          # seconds per article, navigation included
+NAVIGATION_TIMEOUT = 15000     # ms
+NETWORK_IDLE_TIMEOUT = 5000    # ms, pages with endless trackers never go idle
+BLOCKED_RESOURCES = {"image", "font", "media"}
+
+HTTP_TIMEOUT = 10
+HTTP_POOL_SIZE = 16
+MIN_ARTICLE_CHARS = 400        # shorter HTTP extractions go to the browser
+
+RSS_TTL = 30 * 60                  # seconds
+ARTICLE_TTL = 7 * 24 * 60 * 60     # seconds
+TRACKING_PARAMS = {"oc", "ocid", "ref", "cmpid", "fbclid", "gclid"}
+
+_GOOGLE_NEWS_URL = re.compile(rb"https?://[\x21-\x7e]+")
+
+news_cache = CacheStore()
+
+
+def canonical_url(url):
+    parts = urllib.parse.urlsplit(url.strip())
+
+    query = [
+        (k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    ]
+
+    return urllib.parse.urlunsplit((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path.rstrip("/") or "/",
+        urllib.parse.urlencode(sorted(query)),
+        ""
+    ))
+
+
+# ==========================================
+# TEXT EXTRACTION
+# ==========================================
+
+def _extract_with_soup(html):
+    from bs4 import BeautifulSoup
 
-def extract_text_from_html(html):
     soup = BeautifulSoup(html, "html.parser")
 
     for tag in soup(["script", "style", "noscript"]):
@@ -16,48 +71,292 @@ def extract_text_from_html(html):
     return text
 
 
-def fetch_news(symbol, max_items=5):
-    query = f"{symbol} stock India"
-    encoded_query = urllib.parse.quote(query)
-    rss_url = f"https://news.google.com/rss/search?q={encoded_query}&hl=en-IN&gl=IN&ceid=IN:en"
+def _extract_with_lxml(html):
+    try:
+        tree = lxml.html.fromstring(html)
+    except (etree.LxmlError, ValueError):
+        return ""
 
-    feed = feedparser.parse(rss_url)
-    news_data = []
+    for tag in tree.xpath("//script|//style|//noscript"):
+        tag.drop_tree()
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+    paragraphs = (p.text_content().strip() for p in tree.iter("p"))
+    return " ".join(p for p in paragraphs if p)
 
-        page.set_extra_http_headers({
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-        })
 
-        for idx, entry in enumerate(feed.entries[:max_items], start=1):
-            try:
-                # Open Google link → get redirected publisher URL
-                page.goto(entry.link, timeout=60000)
-                real_url = page.url
+def extract_text_from_html(html):
+    if lxml is None:
+        return _extract_with_soup(html)
+    return _extract_with_lxml(html)
+
+
+# ==========================================
+# HTTP FAST PATH
+# ==========================================
+
+_http_session = None
+_http_lock = threading.Lock()
+
+
+def get_http_session():
+
+    global _http_session
+
+    with _http_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({"User-Agent": USER_AGENT})
+            _http_session = session
+
+    return _http_session
+
+
+def _decode_google_news_link(link):
+    # Older article ids are base64 protobufs that embed the publisher URL
+    article_id = urllib.parse.urlparse(link).path.rstrip("/").rsplit("/", 1)[-1]
+
+    try:
+        raw = base64.urlsafe_b64decode(article_id + "=" * (-len(article_id) % 4))
+    except (ValueError, TypeError):
+        return None
+
+    match = _GOOGLE_NEWS_URL.search(raw)
+    return match.group(0).decode("ascii") if match else None
+
+
+def resolve_article_url(link):
+
+    if "news.google.com" not in link:
+        return link
+
+    decoded = _decode_google_news_link(link)
+    if decoded:
+        return decoded
+
+    response = get_http_session().get(link, timeout=HTTP_TIMEOUT, allow_redirects=True)
+
+    if "news.google.com" in response.url:
+        return None
+
+    return response.url
+
+
+@timed("news.http_fetch")
+def fetch_html_http(url):
+
+    response = get_http_session().get(url, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+
+    return response.text
+
+
+# ==========================================
+# SHARED BROWSER POOL
+# ==========================================
+
+class BrowserPool:
+
+    def __init__(self, max_pages=MAX_PAGES, block_resources=True):
+        self.max_pages = max_pages
+        self.block_resources = block_resources
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._slots = asyncio.Semaphore(max_pages)
+        self._start_lock = asyncio.Lock()
+
+    async def start(self):
+        from playwright.async_api import async_playwright
+
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=True)
+        self._context = await self._browser.new_context(user_agent=USER_AGENT)
+        self._context.set_default_navigation_timeout(NAVIGATION_TIMEOUT)
 
-                # Now load actual article
-                page.goto(real_url, timeout=60000)
-                page.wait_for_load_state("networkidle")
+        if self.block_resources:
+            await self._context.route("**/*", self._route)
 
-                html = page.content()
-                full_text = extract_text_from_html(html)
+        return self
 
+    async def close(self):
+        if self._browser:
+            await self._browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+
+    # The browser is only launched once an article needs it
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _route(self, route):
+        if route.request.resource_type in BLOCKED_RESOURCES:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _render(self, url):
+        page = await self._context.new_page()
+
+        try:
+            # Google News links redirect to the publisher page via script
+            await page.goto(url, wait_until="domcontentloaded")
+
+            if "news.google.com" in page.url:
+                await page.wait_for_url(lambda u: "news.google.com" not in u)
+                await page.wait_for_load_state("domcontentloaded")
+
+            try:
+                await page.wait_for_load_state("networkidle", timeout=NETWORK_IDLE_TIMEOUT)
             except Exception:
-                full_text = ""
+                pass
+
+            return await page.content()
+
+        finally:
+            await page.close()
+
+    @timed("news.browser_fetch")
+    async def fetch_html(self, url, deadline=ARTICLE_DEADLINE):
+        async with self._start_lock:
+            if self._context is None:
+                await self.start()
+
+        async with self._slots:
+            return await asyncio.wait_for(self._render(url), timeout=deadline)
+
 
-            news_data.append({
-                "index": idx,
+# ==========================================
+# NEWS
+# ==========================================
+
+@timed("news.rss")
+def _rss_entries(symbol, max_items, use_cache=True):
+    query = f"{symbol} stock India"
+    encoded_query = urllib.parse.quote(query)
+    rss_url = f"https://news.google.com/rss/search?q={encoded_query}&hl=en-IN&gl=IN&ceid=IN:en"
+
+    entries = news_cache.get("rss", rss_url, ttl=RSS_TTL) if use_cache else None
+
+    if entries is None:
+        import feedparser
+
+        feed = feedparser.parse(rss_url)
+
+        entries = [
+            {
+                "link": entry.link,
                 "title": entry.title,
                 "source": entry.get("source", {}).get("title", "Unknown"),
-                "content": full_text[:2000]
-            })
+            }
+            for entry in feed.entries
+        ]
+
+        if use_cache and entries:
+            news_cache.set("rss", rss_url, entries)
+
+    return entries[:max_items]
+
+
+@timed("news.extract_article")
+async def extract_article(link, pool, http_first=True, use_cache=True):
 
-        browser.close()
+    link_key = canonical_url(link)
+
+    if use_cache:
+        cached = news_cache.get("article", link_key, ttl=ARTICLE_TTL)
+        if cached is not None:
+            count("news.cache_hits")
+            return cached["text"]
+
+    url = link
+    text = ""
+
+    if http_first:
+        try:
+            url = await asyncio.to_thread(resolve_article_url, link)
+
+            if url and use_cache:
+                cached = news_cache.get("article", canonical_url(url), ttl=ARTICLE_TTL)
+                if cached is not None:
+                    count("news.cache_hits")
+                    news_cache.set("article", link_key, cached)
+                    return cached["text"]
+
+            if url:
+                html = await asyncio.to_thread(fetch_html_http, url)
+                text = extract_text_from_html(html)
+        except Exception:
+            text = ""
+
+    if len(text) < MIN_ARTICLE_CHARS:
+        count("news.browser_fallbacks")
+        try:
+            html = await pool.fetch_html(url or link)
+            text = max(text, extract_text_from_html(html), key=len)
+        except Exception:
+            pass
+
+    # Failed extractions are retried on the next run
+    if use_cache and text:
+        value = {"url": url or link, "text": text}
+        news_cache.set("article", link_key, value)
+        if url:
+            news_cache.set("article", canonical_url(url), value)
+
+    return text
+
+
+async def _fetch_article(pool, idx, entry, http_first=True, use_cache=True):
+    full_text = await extract_article(entry["link"], pool, http_first, use_cache)
+
+    return {
+        "index": idx,
+        "title": entry["title"],
+        "source": entry["source"],
+        "content": full_text[:2000]
+    }
+
+
+async def fetch_news_async(symbol, pool, max_items=5, http_first=True, use_cache=True):
+    entries = await asyncio.to_thread(_rss_entries, symbol, max_items, use_cache)
+
+    return list(await asyncio.gather(*[
+        _fetch_article(pool, idx, entry, http_first, use_cache)
+        for idx, entry in enumerate(entries, start=1)
+    ]))
+
+
+async def fetch_news_many_async(symbols, max_items=5, max_pages=MAX_PAGES, block_resources=True,
+                                http_first=True, use_cache=True):
+    async with BrowserPool(max_pages=max_pages, block_resources=block_resources) as pool:
+        results = await asyncio.gather(*[
+            fetch_news_async(symbol, pool, max_items, http_first, use_cache) for symbol in symbols
+        ])
+
+    return dict(zip(symbols, results))
+
+
+@timed("news.fetch_news")
+def fetch_news_many(symbols, max_items=5, max_pages=MAX_PAGES, block_resources=True,
+                    http_first=True, use_cache=True):
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return {}
+
+    return asyncio.run(fetch_news_many_async(
+        symbols, max_items, max_pages, block_resources, http_first, use_cache
+    ))
+
+
+def fetch_news(symbol, max_items=5):
+    return fetch_news_many([symbol], max_items)[symbol]
 
-    return news_data
 
 def format_for_gpt(symbol, articles):
     formatted = f"Stock: {symbol}\n\nNews Articles:\n\n"
@@ -70,4 +369,4 @@ def format_for_gpt(symbol, articles):
             f"Content:\n{article['content']}\n\n"
         )
 
-    return formatted
\ No newline at end of file
+    return formatted
@@ -0,0 +1,249 @@
+import json
+import os
+import urllib.parse
+import numpy as np
+import pandas as pd
+from services.db_data_loader import count_rows, load_universe_data
+from services.instrumentation import timed
+from services.price_panel import PricePanel
+
+
+CACHE_DIR = os.getenv("PRICE_CACHE_DIR", os.path.join("data", "price_cache"))
+MANIFEST_FILE = "manifest.json"
+
+PRICE_COLUMNS = ["open", "high", "low", "close", "volume"]
+PRICE_DTYPE = np.dtype([
+    ("date", "datetime64[D]"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "i8"),
+])
+
+
+# ==========================================
+# FILE LAYOUT
+# ==========================================
+
+def _symbol_path(symbol, cache_dir):
+    return os.path.join(cache_dir, urllib.parse.quote(symbol, safe="") + ".npy")
+
+
+def _load_manifest(cache_dir):
+
+    path = os.path.join(cache_dir, MANIFEST_FILE)
+
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_manifest(cache_dir, manifest):
+
+    path = os.path.join(cache_dir, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    os.replace(tmp_path, path)
+
+
+def _to_records(df):
+
+    records = np.empty(len(df), dtype=PRICE_DTYPE)
+    records["date"] = df.index.values.astype("datetime64[D]")
+
+    for column in PRICE_COLUMNS:
+        records[column] = df[column].to_numpy()
+
+    return records
+
+
+def _append_records(path, records):
+
+    if os.path.exists(path):
+        records = np.concatenate([np.load(path), records])
+
+    # np.save appends ".npy" to names without it, keep the suffix on the temp file
+    tmp_path = path[:-len(".npy")] + ".tmp.npy"
+    np.save(tmp_path, records)
+    os.replace(tmp_path, path)
+
+
+# ==========================================
+# INCREMENTAL REFRESH FROM DB
+# ==========================================
+#
+# Each symbol only pulls rows after its watermark (last cached date), so
+# rows backfilled or corrected at older dates never reach the cache.
+# Run a full rebuild (manage_db cache --full) after load_full_history or
+# any edit to past prices. verify=True (--verify) is the cheaper check:
+# it compares row counts with daily_prices and rebuilds the symbols that
+# differ, which catches inserted or deleted days but not values changed
+# in place.
+
+def _cached_rows(symbol, cache_dir):
+
+    path = _symbol_path(symbol, cache_dir)
+
+    return len(np.load(path, mmap_mode="r")) if os.path.exists(path) else 0
+
+
+def _invalidate(symbols, manifest, cache_dir):
+
+    for symbol in symbols:
+        path = _symbol_path(symbol, cache_dir)
+        if os.path.exists(path):
+            os.remove(path)
+        manifest.pop(symbol, None)
+
+
+def _pull(symbols, manifest, cache_dir):
+
+    # Symbols sharing a watermark are pulled together in one universe query
+    groups = {}
+    for symbol in symbols:
+        groups.setdefault(manifest.get(symbol), []).append(symbol)
+
+    appended = 0
+
+    for watermark, group in groups.items():
+
+        start_date = None
+        if watermark:
+            start_date = (pd.Timestamp(watermark) + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+
+        fresh = load_universe_data(group, start_date=start_date)
+
+        for symbol, df in fresh.items():
+            _append_records(_symbol_path(symbol, cache_dir), _to_records(df))
+            manifest[symbol] = df.index[-1].strftime("%Y-%m-%d")
+            appended += len(df)
+
+    return appended
+
+
+@timed("price_cache.refresh")
+def refresh_cache(symbols, cache_dir=CACHE_DIR, full=False, verify=False):
+
+    symbols = list(dict.fromkeys(symbols))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = _load_manifest(cache_dir)
+
+    if full:
+        _invalidate(symbols, manifest, cache_dir)
+
+    appended = _pull(symbols, manifest, cache_dir)
+
+    if verify and not full:
+        counts = count_rows(symbols)
+        stale = [s for s in symbols if counts.get(s, 0) != _cached_rows(s, cache_dir)]
+
+        if stale:
+            print("Rebuilding cache for", len(stale), "symbols with changed history")
+            _invalidate(stale, manifest, cache_dir)
+            appended += _pull(stale, manifest, cache_dir)
+
+    _save_manifest(cache_dir, manifest)
+
+    return appended
+
+
+# ==========================================
+# READ FROM MEMORY-MAPPED FILES
+# ==========================================
+
+def _read_window(symbol, start_date=None, end_date=None, cache_dir=CACHE_DIR):
+
+    path = _symbol_path(symbol, cache_dir)
+
+    if not os.path.exists(path):
+        return None
+
+    records = np.load(path, mmap_mode="r")
+    dates = records["date"]
+
+    lo = 0
+    hi = len(records)
+    if start_date:
+        lo = np.searchsorted(dates, np.datetime64(start_date, "D"), side="left")
+    if end_date:
+        hi = np.searchsorted(dates, np.datetime64(end_date, "D"), side="right")
+
+    if lo >= hi:
+        return None
+
+    return records[lo:hi]
+
+
+def read_cached_symbol(symbol, start_date=None, end_date=None, cache_dir=CACHE_DIR):
+
+    window = _read_window(symbol, start_date, end_date, cache_dir)
+
+    if window is None:
+        return None
+
+    df = pd.DataFrame(
+        {column: window[column] for column in PRICE_COLUMNS},
+        index=pd.DatetimeIndex(window["date"].astype("datetime64[ns]"), name="date")
+    )
+
+    return df
+
+
+@timed("price_cache.load_universe")
+def load_cached_universe(symbols, start_date=None, end_date=None, refresh=True, cache_dir=CACHE_DIR):
+
+    symbols = list(dict.fromkeys(symbols))
+
+    if refresh:
+        refresh_cache(symbols, cache_dir=cache_dir)
+
+    universe = {}
+
+    for symbol in symbols:
+        df = read_cached_symbol(symbol, start_date, end_date, cache_dir=cache_dir)
+        if df is not None:
+            universe[symbol] = df
+
+    return universe
+
+
+# Straight from the mapped records into panel arrays, no per-symbol frames
+@timed("price_cache.load_panel")
+def load_cached_panel(symbols, start_date=None, end_date=None, refresh=True, min_bars=0,
+                      float_dtype=np.float64, cache_dir=CACHE_DIR):
+
+    symbols = list(dict.fromkeys(symbols))
+
+    if refresh:
+        refresh_cache(symbols, cache_dir=cache_dir)
+
+    windows = {}
+
+    for symbol in symbols:
+        window = _read_window(symbol, start_date, end_date, cache_dir=cache_dir)
+        if window is not None and len(window) >= min_bars:
+            windows[symbol] = window
+
+    if not windows:
+        return PricePanel([], [], np.zeros((0, 0), dtype=bool))
+
+    dates = np.unique(np.concatenate([w["date"] for w in windows.values()]))
+    panel = PricePanel(
+        dates.astype("datetime64[ns]"), list(windows),
+        np.zeros((len(dates), len(windows)), dtype=bool), float_dtype=float_dtype
+    )
+
+    for s, window in enumerate(windows.values()):
+        rows = np.searchsorted(dates, window["date"])
+        panel.valid[rows, s] = True
+        for column in PRICE_COLUMNS:
+            panel.set_values(column, s, rows, window[column])
+
+    return panel
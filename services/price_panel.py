@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+
+PRICE_FIELDS = ["open", "high", "low", "close", "volume"]
+
+
+# ==========================================
+# DATE x SYMBOL PANEL
+# ==========================================
+#
+# One contiguous (dates x symbols) array per field plus a validity mask
+# for missing bars. Rows are dates, so a backtest day reads one
+# contiguous row per field. Date slices and field selections share the
+# underlying arrays.
+#
+# Missing cells hold NaN (float), False (bool) or 0 (int), always check
+# `valid` before reading them. Float fields default to float64, which
+# keeps results identical to the per-symbol pandas code; float32 halves
+# the memory at the cost of that exactness. The backtests can narrow
+# just the fields they only compare against (see cast).
+
+class PricePanel:
+
+    def __init__(self, dates, symbols, valid, fields=None, float_dtype=np.float64):
+        self.dates = pd.DatetimeIndex(dates)
+        self.symbols = list(symbols)
+        self.valid = valid
+        self.fields = dict(fields or {})
+        self.float_dtype = np.dtype(float_dtype)
+        self._positions = {symbol: s for s, symbol in enumerate(self.symbols)}
+
+    def __getitem__(self, name):
+        if name == "valid":
+            return self.valid
+        return self.fields[name]
+
+    def __setitem__(self, name, values):
+        self.fields[name] = values
+
+    def __contains__(self, name):
+        return name == "valid" or name in self.fields
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def shape(self):
+        return self.valid.shape
+
+    @property
+    def nbytes(self):
+        return self.valid.nbytes + sum(np.asarray(a).nbytes for a in self.fields.values())
+
+    def position(self, symbol):
+        return self._positions[symbol]
+
+    # ----- writing -----
+
+    def _allocate(self, name, dtype):
+
+        dtype = np.dtype(dtype)
+
+        if dtype == bool:
+            arr = np.zeros(self.shape, dtype=bool)
+        elif dtype.kind in "iu":
+            arr = np.zeros(self.shape, dtype=np.int64)
+        else:
+            arr = np.full(self.shape, np.nan, dtype=self.float_dtype)
+
+        self.fields[name] = arr
+        return arr
+
+    def set_values(self, name, cols, rows, values):
+
+        arr = self.fields.get(name)
+
+        if arr is None:
+            arr = self._allocate(name, np.asarray(values).dtype)
+
+        arr[rows, cols] = values
+
+    # Narrows fields in place, e.g. indicators to float32 for a sweep
+    def cast(self, names, dtype):
+
+        for name in names:
+            self.fields[name] = self.fields[name].astype(dtype, copy=False)
+
+        return self
+
+    # ----- zero-copy views -----
+
+    def select(self, names):
+        return PricePanel(
+            self.dates, self.symbols, self.valid,
+            {name: self.fields[name] for name in names}, self.float_dtype
+        )
+
+    def slice_rows(self, lo, hi):
+        return PricePanel(
+            self.dates[lo:hi], self.symbols, self.valid[lo:hi],
+            {name: arr[lo:hi] for name, arr in self.fields.items()}, self.float_dtype
+        )
+
+    # Inclusive of both ends, like .loc on a DatetimeIndex
+    def slice_dates(self, start=None, end=None):
+
+        lo = 0 if start is None else self.dates.searchsorted(pd.Timestamp(start), side="left")
+        hi = len(self.dates) if end is None else self.dates.searchsorted(pd.Timestamp(end), side="right")
+
+        return self.slice_rows(lo, hi)
+
+    def column(self, name, symbol):
+        return self[name][:, self.position(symbol)]
+
+    # ----- per-symbol bridge for the pandas indicator code -----
+
+    def symbol_frame(self, symbol, names=PRICE_FIELDS):
+
+        s = self.position(symbol)
+        rows = np.flatnonzero(self.valid[:, s])
+
+        return pd.DataFrame(
+            {name: self.fields[name][rows, s] for name in names},
+            index=pd.DatetimeIndex(self.dates[rows], name="date")
+        )
+
+    # fn(symbol, df) returns a frame holding `names` for the symbol's bars
+    def map_symbols(self, fn, names):
+
+        for s, symbol in enumerate(self.symbols):
+            rows = np.flatnonzero(self.valid[:, s])
+            df = fn(symbol, self.symbol_frame(symbol))
+            for name in names:
+                self.set_values(name, s, rows, df[name].to_numpy())
+
+        return self
+
+    # Long frame in date order, symbols in panel order within a date;
+    # the layout the per-date reference loops were written against
+    def to_frame(self, names=None):
+
+        names = list(self.fields) if names is None else names
+        date_idx, sym_idx = np.nonzero(self.valid)
+
+        df = pd.DataFrame(
+            {name: np.asarray(self.fields[name])[date_idx, sym_idx] for name in names},
+            index=pd.DatetimeIndex(self.dates[date_idx], name="date")
+        )
+        df.insert(0, "symbol", np.asarray(self.symbols, dtype=object)[sym_idx])
+
+        return df
@@ -1,19 +1,42 @@
-from openai import OpenAI
+import asyncio
+import hashlib
+import json
+import os
+from services.cache_store import CacheStore
 from services.news_fetcher import format_for_gpt
+from services.instrumentation import count, timed
 
-client = OpenAI(api_key="API_KEY")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # point at a local fake endpoint for tests
 
+MODEL = "gpt-4o-mini"
+PROMPT_VERSION = 1  # bump when the prompt below changes, old cache entries stop matching
+MAX_CONCURRENCY = 4
 
-def analyze_sentiment(symbol, headlines):
+sentiment_cache = CacheStore()
+
+# Neutral results carry every key print_scan reads
+NO_NEWS = {
+    "score": 0,
+    "summary": "No recent news",
+    "decision": "NORMAL",
+    "reason": "No recent news",
+    "risks": "None identified"
+}
+
+FAILED = {
+    "score": 0,
+    "summary": "Sentiment unavailable",
+    "decision": "NORMAL",
+    "reason": "Sentiment call failed",
+    "risks": "Not assessed"
+}
+
+
+def build_prompt(symbol, headlines):
     prompt_data = format_for_gpt(symbol, headlines)
-    if not headlines:
-        return {
-            "score": 0,
-            "summary": "No recent news",
-            "decision": "NORMAL"
-        }
 
-    prompt = f"""
+    return f"""
 You are a professional financial sentiment analyst specializing in equity markets.
 
 You will receive structured stock news data including:
@@ -60,11 +83,86 @@ Return JSON in this format:
 """
 
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0,
-        response_format={"type": "json_object"}
-    )
+def cache_key(symbol, headlines):
+    # Symbol is part of the prompt, so it is part of the key too
+    payload = json.dumps({
+        "symbol": symbol,
+        "model": MODEL,
+        "prompt_version": PROMPT_VERSION,
+        "articles": [[a["title"], a["source"], a["content"]] for a in headlines],
+    }, sort_keys=True)
+
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@timed("sentiment.analyze_sentiment")
+async def analyze_sentiment_async(symbol, headlines, client, slots):
+    if not headlines:
+        return dict(NO_NEWS)
+
+    key = cache_key(symbol, headlines)
+
+    cached = await asyncio.to_thread(sentiment_cache.get, "sentiment", key)
+    if cached is not None:
+        count("sentiment.cache_hits")
+        return cached
+
+    async with slots:
+        count("sentiment.api_calls")
+        response = await client.chat.completions.create(
+            model=MODEL,
+            messages=[{"role": "user", "content": build_prompt(symbol, headlines)}],
+            temperature=0,
+            response_format={"type": "json_object"}
+        )
+
+    # Raises on malformed output, so nothing is cached for it
+    result = json.loads(response.choices[0].message.content)
+    if not isinstance(result, dict) or "score" not in result or "decision" not in result:
+        raise ValueError(f"Malformed sentiment response: {str(result)[:200]}")
+
+    result = {"reason": "", "risks": "", "summary": "", **result}
 
-    return eval(response.choices[0].message.content)
+    await asyncio.to_thread(sentiment_cache.set, "sentiment", key, result)
+
+    return result
+
+
+async def analyze_many_async(news, max_concurrency=MAX_CONCURRENCY):
+    # Imported here, the client library alone is most of a scanner's startup
+    from openai import AsyncOpenAI
+
+    client = AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
+    slots = asyncio.Semaphore(max_concurrency)
+
+    # One failed call must not throw away the rest of the batch
+    try:
+        results = await asyncio.gather(*[
+            analyze_sentiment_async(symbol, headlines, client, slots)
+            for symbol, headlines in news.items()
+        ], return_exceptions=True)
+    finally:
+        await client.close()
+
+    sentiments = {}
+
+    for symbol, result in zip(news, results):
+        if isinstance(result, BaseException):
+            print(f"Sentiment failed for {symbol}: {type(result).__name__}: {result}")
+            count("sentiment.failures")
+            result = dict(FAILED)
+        sentiments[symbol] = result
+
+    return sentiments
+
+
+@timed("sentiment.analyze_many")
+def analyze_many(news, max_concurrency=MAX_CONCURRENCY):
+    if not news:
+        return {}
+
+    return asyncio.run(analyze_many_async(news, max_concurrency))
+
+
+def analyze_sentiment(symbol, headlines):
+    return analyze_many({symbol: headlines})[symbol]
@@ -1,30 +1,167 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import pandas as pd
 from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from services.instrumentation import count, span, timed
 
 ACCESS_TOKEN = "ACCESSTOKEN"
-BASE_URL = "https://api.upstox.com/v2/historical-candle"
+BASE_URL = os.getenv("UPSTOX_BASE_URL", "https://api.upstox.com/v2/historical-candle")
 
 HEADERS = {
     "Accept": "application/json",
     "Authorization": f"Bearer {ACCESS_TOKEN}"
 }
 
+MAX_WORKERS = 8
+REQUEST_TIMEOUT = 30
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 0.5
+RETRY_STATUS = {429, 500, 502, 503, 504}
 
-def fetch_chunk(instrument_key, start_date, end_date):
+# Upstox standard API limits: (requests, per seconds)
+RATE_LIMITS = [(50, 1.0), (500, 60.0), (2000, 1800.0)]
+
+
+# ==========================================
+# RATE LIMITING
+# ==========================================
+
+class TokenBucket:
+
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class RateLimiter:
+
+    def __init__(self, limits):
+        self.buckets = [TokenBucket(capacity, period) for capacity, period in limits]
+
+    def acquire(self):
+        for bucket in self.buckets:
+            bucket.acquire()
+
+
+limiter = RateLimiter(RATE_LIMITS)
+
+
+# ==========================================
+# HTTP SESSION
+# ==========================================
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(HEADERS)
+            _session = session
+
+    return _session
+
+
+def _retry_delay(attempt, response=None):
+
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+
+    return BACKOFF_SECONDS * (2 ** attempt) * (1 + random.random() * 0.25)
+
+
+# None once retries are exhausted on connection errors/timeouts, so the
+# caller treats it like any other failed response
+def _get(url):
+
+    session = get_session()
+
+    for attempt in range(MAX_RETRIES + 1):
+
+        with span("upstox.rate_limit_wait"):
+            limiter.acquire()
+
+        try:
+            response = session.get(url, timeout=REQUEST_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == MAX_RETRIES:
+                print("Giving up after error:", e)
+                return None
+            print("Retrying after error:", e)
+            count("upstox.retries")
+            time.sleep(_retry_delay(attempt))
+            continue
+
+        if response.status_code in RETRY_STATUS and attempt < MAX_RETRIES:
+            count("upstox.retries")
+            time.sleep(_retry_delay(attempt, response))
+            continue
+
+        return response
+
+
+# ==========================================
+# FETCH
+# ==========================================
+
+# (frame or None, ok); ok is False when the request itself failed, as
+# opposed to Upstox returning no candles for the range
+@timed("upstox.fetch_chunk")
+def _fetch(instrument_key, start_date, end_date):
 
     url = f"{BASE_URL}/{instrument_key}/day/{end_date}/{start_date}"
 
-    response = requests.get(url, headers=HEADERS)
+    response = _get(url)
+
+    if response is None:
+        count("upstox.failed_chunks")
+        return None, False
 
     if response.status_code != 200:
-        print("Error:", response.json())
-        return None
+        try:
+            print("Error:", response.json())
+        except ValueError:
+            print("Error:", response.status_code, response.text[:200])
+        count("upstox.failed_chunks")
+        return None, False
 
     data = response.json()["data"]["candles"]
 
     if not data:
-        return None
+        return None, True
 
     df = pd.DataFrame(data, columns=[
         "date", "open", "high", "low", "close", "volume", "unknown"
@@ -36,36 +173,77 @@ def fetch_chunk(instrument_key, start_date, end_date):
     df = df[["open", "high", "low", "close", "volume"]]
     df.sort_index(inplace=True)
 
-    return df
+    return df, True
 
 
-def load_stock_data(instrument_key, start_date, end_date):
+def fetch_chunk(instrument_key, start_date, end_date):
+    return _fetch(instrument_key, start_date, end_date)[0]
+
+
+def chunk_ranges(start_date, end_date):
 
     start = datetime.strptime(start_date, "%Y-%m-%d")
     end = datetime.strptime(end_date, "%Y-%m-%d")
 
-    all_data = []
+    ranges = []
 
-    while start < end:
+    while start <= end:
 
         chunk_end = min(start + timedelta(days=365), end)
 
-        df_chunk = fetch_chunk(
-            instrument_key,
-            start.strftime("%Y-%m-%d"),
-            chunk_end.strftime("%Y-%m-%d")
-        )
-
-        if df_chunk is not None:
-            all_data.append(df_chunk)
+        ranges.append((start.strftime("%Y-%m-%d"), chunk_end.strftime("%Y-%m-%d")))
 
         start = chunk_end + timedelta(days=1)
 
-    if not all_data:
+    return ranges
+
+
+def _combine(chunks):
+
+    chunks = [c for c in chunks if c is not None]
+
+    if not chunks:
         return None
 
-    final_df = pd.concat(all_data)
+    final_df = pd.concat(chunks)
     final_df = final_df[~final_df.index.duplicated(keep="first")]
     final_df.sort_index(inplace=True)
     final_df.index = final_df.index.tz_localize(None)
     return final_df
+
+
+# Returns ({key: frame or None}, failed keys). A failed chunk would leave
+# a hole in the series, so that instrument is dropped for this run and
+# the rest of the batch is kept; the caller decides how loud to be
+@timed("upstox.load_many")
+def load_many(instrument_keys, start_date, end_date, max_workers=MAX_WORKERS):
+
+    # Every (instrument, year chunk) pair is one task on a shared pool
+    tasks = [
+        (key, chunk_start, chunk_end)
+        for key in dict.fromkeys(instrument_keys)
+        for chunk_start, chunk_end in chunk_ranges(start_date, end_date)
+    ]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(lambda task: _fetch(*task), tasks))
+
+    chunks = {}
+    failed = []
+    for (key, _, _), (df, ok) in zip(tasks, results):
+        chunks.setdefault(key, []).append(df)
+        if not ok and key not in failed:
+            failed.append(key)
+
+    if failed:
+        print(f"WARNING: dropped {len(failed)} of {len(chunks)} instruments after failed requests:",
+              ", ".join(failed))
+
+    fetched = {key: None if key in failed else _combine(frames) for key, frames in chunks.items()}
+
+    return fetched, failed
+
+
+def load_stock_data(instrument_key, start_date, end_date, max_workers=MAX_WORKERS):
+
+    return load_many([instrument_key], start_date, end_date, max_workers)[0].get(instrument_key)
@@ -0,0 +1,39 @@
+import os
+import shutil
+import tempfile
+import pytest
+
+
+# Services read their database, cache and state locations at import
+# time, so they are pointed at a scratch directory before any test
+# module imports one. Nothing touches Postgres or the real data/ folder.
+WORKDIR = tempfile.mkdtemp(prefix="stock-screener-tests-")
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(WORKDIR, "prices.sqlite3")
+os.environ["PRICE_CACHE_DIR"] = os.path.join(WORKDIR, "price_cache")
+os.environ["CACHE_DB_FILE"] = os.path.join(WORKDIR, "cache.sqlite3")
+os.environ["INDICATOR_STATE_FILE"] = os.path.join(WORKDIR, "indicator_state.json")
+os.environ["TIMING_DIR"] = os.path.join(WORKDIR, "timing")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+# Empty daily_prices table and indicator cache for each test
+@pytest.fixture
+def price_table():
+
+    from sqlalchemy import text
+    from benchmarks.synthetic import create_price_table
+    from services.indicators import clear_indicator_cache
+
+    engine = create_price_table(os.environ["DATABASE_URL"])
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM daily_prices"))
+    engine.dispose()
+
+    clear_indicator_cache()
+    shutil.rmtree(os.environ["PRICE_CACHE_DIR"], ignore_errors=True)
+
+    yield
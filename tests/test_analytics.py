@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+from backtest.analytics import daily_analytics, position_matrices
+from services.price_panel import PricePanel
+
+
+def panel(n_days=6):
+
+    dates = pd.bdate_range("2024-01-01", periods=n_days)
+    close = np.linspace(100, 110, n_days)[:, None]
+
+    return PricePanel(dates, ["A"], np.ones((n_days, 1), dtype=bool), {"close": close})
+
+
+def trade(entry_date, exit_day, qty, entry=100.0, stop=95.0, pnl=10.0):
+    return {"symbol": 0, "entry_date": entry_date, "exit_day": exit_day, "qty": qty,
+            "entry": entry, "stop": stop, "pnl": pnl}
+
+
+def test_same_day_exit_and_reentry_leaves_nothing_held():
+
+    # 123.45 - 123.45 + 0.2 - 0.2 is 2.8e-15 as a float cumsum
+    trade_log = [trade(0, 2, 123.45), trade(2, 4, 0.2)]
+
+    m = position_matrices(panel(), trade_log)
+    daily, _ = daily_analytics(panel(), trade_log, 100000)
+
+    assert m["open"][:, 0].tolist() == [1, 1, 1, 1, 0, 0]
+    assert (m["qty"][4:] == 0).all()
+    assert (m["value"][4:] == 0).all()
+    assert (m["cost"][4:] == 0).all()
+    assert daily["positions"].tolist() == [1, 1, 1, 1, 0, 0]
+    assert daily["gross_exposure"].iloc[4:].eq(0).all()
+
+
+def test_open_trade_is_held_to_the_last_day():
+
+    m = position_matrices(panel(), [trade(3, None, 2.0)])
+
+    assert m["open"][:, 0].tolist() == [0, 0, 0, 1, 1, 1]
+    assert m["value"][5, 0] == 2.0 * 110
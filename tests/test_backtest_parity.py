@@ -0,0 +1,57 @@
+import pytest
+from backtest import breakout_trend, vcp_backtest
+from benchmarks.synthetic import generate_symbol, generate_universe
+from services.db_writer import store_prices
+
+
+SYMBOLS = [f"SYN{i:02d}" for i in range(30)]
+YEARS = 4
+
+# stock_list.csv repeats a few symbols, the backtests must still load
+# and trade each of them once
+REQUESTED = SYMBOLS[:10] + ["SYN03"] + SYMBOLS[10:] + ["SYN17"]
+
+
+@pytest.fixture
+def universe(price_table, monkeypatch):
+
+    frames = generate_universe(SYMBOLS, years=YEARS, seed=7)
+    store_prices(frames)
+
+    for module in [breakout_trend, vcp_backtest]:
+        monkeypatch.setattr(module, "START_DATE", "2015-01-01")
+        monkeypatch.setattr(module, "END_DATE", "2019-12-31")
+
+    return frames
+
+
+def assert_matches_legacy(master, run_backtest, run_backtest_legacy):
+
+    capital, trades, equity_curve = run_backtest(master)
+    legacy_capital, legacy_trades, legacy_equity_curve = run_backtest_legacy(master)
+
+    assert len(trades) > 20
+    assert trades == legacy_trades
+    assert equity_curve == legacy_equity_curve
+    assert capital == legacy_capital
+
+
+def test_breakout_matches_legacy_loop(universe):
+
+    nifty = generate_symbol("NIFTY 50", years=YEARS, seed=7)
+    master = breakout_trend.prepare_master(REQUESTED, nifty_df=nifty)
+
+    assert master.symbols == SYMBOLS
+    assert not master.valid.all()
+
+    assert_matches_legacy(master, breakout_trend.run_backtest, breakout_trend.run_backtest_legacy)
+
+
+def test_vcp_matches_legacy_loop(universe):
+
+    master = vcp_backtest.prepare_master(REQUESTED)
+
+    assert master.symbols == SYMBOLS
+    assert not master.valid.all()
+
+    assert_matches_legacy(master, vcp_backtest.run_backtest, vcp_backtest.run_backtest_legacy)
@@ -0,0 +1,110 @@
+import io
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+from services import db_writer
+
+
+ROWS = pd.DataFrame({
+    "symbol": ["A", "A"],
+    "date": [pd.Timestamp("2024-01-02").date(), pd.Timestamp("2024-01-03").date()],
+    "open": [1.0, 2.0], "high": [1.5, 2.5], "low": [0.5, 1.5], "close": [1.2, 2.2],
+    "volume": [100, 200],
+})
+
+
+# ==========================================
+# FAKE DRIVER CONNECTIONS
+# ==========================================
+#
+# Just enough of each driver's cursor to see which COPY API was used
+# and what it was given
+
+class Psycopg3Cursor:
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def copy(self, sql):
+        copy = SimpleNamespace(write=lambda data: self.calls.append(("copy", sql, data)))
+        cursor = self
+
+        class Copy:
+            def __enter__(self):
+                return copy
+
+            def __exit__(self, *args):
+                cursor.calls.append(("done",))
+
+        return Copy()
+
+
+class Psycopg2Cursor(Psycopg3Cursor):
+
+    def copy_expert(self, sql, buffer):
+        self.calls.append(("copy_expert", sql, buffer.read()))
+
+
+def fake_conn(driver, cursor_class):
+
+    calls = []
+    raw = SimpleNamespace(cursor=lambda: cursor_class(calls))
+    conn = SimpleNamespace(
+        dialect=SimpleNamespace(name="postgresql", driver=driver),
+        connection=SimpleNamespace(driver_connection=raw),
+    )
+
+    return conn, calls
+
+
+def expected_csv():
+    buffer = io.StringIO()
+    ROWS.to_csv(buffer, index=False, header=False)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("driver", ["psycopg", "psycopg2"])
+def test_both_postgres_drivers_copy(driver):
+
+    conn, _ = fake_conn(driver, Psycopg2Cursor)
+    assert db_writer._can_copy(conn)
+
+
+def test_psycopg3_copies_through_cursor_copy():
+
+    conn, calls = fake_conn("psycopg", Psycopg3Cursor)
+
+    db_writer._copy_rows(conn, ROWS)
+
+    assert calls[0][0] == "copy"
+    assert calls[0][1].startswith(f"COPY {db_writer.STAGING_TABLE} (symbol, date,")
+    assert calls[0][2] == expected_csv()
+    assert calls[1] == ("done",)
+
+
+def test_psycopg2_copies_through_copy_expert():
+
+    conn, calls = fake_conn("psycopg2", Psycopg2Cursor)
+
+    db_writer._copy_rows(conn, ROWS)
+
+    assert calls == [("copy_expert", calls[0][1], expected_csv())]
+
+
+# ==========================================
+# SQLITE FALLBACK
+# ==========================================
+
+def test_sqlite_falls_back_to_insert_and_says_so(price_table, capsys):
+
+    frame = ROWS.drop(columns=["symbol"]).set_index(pd.DatetimeIndex(ROWS["date"]))
+
+    assert db_writer.store_prices({"A": frame}) == {"inserted": 2, "skipped": 0}
+    assert db_writer.store_prices({"A": frame}) == {"inserted": 0, "skipped": 2}
+    assert "Staging 2 rows with INSERT (sqlite+pysqlite)" in capsys.readouterr().out
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+from services.indicator_state import advance_state, new_state
+from services.indicators import add_indicators
+
+
+INDICATORS = [
+    "ema_50", "ema_200", "hh_20", "ll_10", "ll_7", "vol_ma_20",
+    "atr_14", "atr_mean_50", "rsi",
+]
+
+
+def make_frame(bars=600, seed=0, gaps=()):
+
+    rng = np.random.default_rng(seed)
+
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, bars)))
+    open_ = close * (1 + rng.normal(0, 0.005, bars))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, bars))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, bars))
+    volume = rng.integers(10_000, 100_000, bars).astype(float)
+
+    df = pd.DataFrame(
+        {"open": open_, "high": high, "low": low, "close": close, "volume": volume},
+        index=pd.bdate_range("2022-01-03", periods=bars, name="date")
+    )
+
+    # Missing candles stored as NaN rows
+    for lo, hi in gaps:
+        df.iloc[lo:hi] = np.nan
+
+    return df
+
+
+def advance_all(df):
+
+    state = new_state()
+    rows = []
+
+    for date, bar in df.iterrows():
+        rows.append(advance_state(state, date.strftime("%Y-%m-%d"), bar))
+
+    return pd.DataFrame(rows, index=df.index)
+
+
+@pytest.mark.parametrize("gaps", [(), ((250, 251),), ((120, 125), (400, 402))])
+def test_state_matches_full_recompute(gaps):
+
+    df = make_frame(gaps=gaps)
+
+    expected = add_indicators(df.copy(), INDICATORS)
+    actual = advance_all(df)
+
+    for name in INDICATORS:
+        np.testing.assert_allclose(
+            actual[name].to_numpy(dtype=float),
+            expected[name].to_numpy(dtype=float),
+            rtol=1e-9, equal_nan=True, err_msg=name
+        )
+
+
+def test_ema_50_shift_5_matches_shifted_column():
+
+    df = make_frame(bars=300)
+
+    expected = add_indicators(df.copy(), ["ema_50"])["ema_50"].shift(5)
+    actual = advance_all(df)["ema_50_shift_5"]
+
+    np.testing.assert_allclose(actual.to_numpy(dtype=float), expected.to_numpy(), rtol=1e-12, equal_nan=True)
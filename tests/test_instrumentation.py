@@ -0,0 +1,17 @@
+import re
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+# Two functions under one span name would be summed into one report line
+def test_timed_span_names_are_unique():
+
+    names = {}
+
+    for path in sorted(ROOT.rglob("*.py")):
+        for name in re.findall(r'@timed\("([^"]+)"\)', path.read_text()):
+            names.setdefault(name, []).append(str(path.relative_to(ROOT)))
+
+    assert {name: paths for name, paths in names.items() if len(paths) > 1} == {}
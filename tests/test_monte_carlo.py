@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from backtest import monte_carlo as mc
+
+
+def reference_stats(growth, initial_capital):
+
+    final, drawdown, streak = [], [], []
+
+    for path in growth:
+        equity = np.cumprod(path)
+        peak = np.maximum(np.maximum.accumulate(equity), 1)
+        losses = np.diff(np.flatnonzero(np.concatenate([[True], path >= 1, [True]]))) - 1
+        final.append(initial_capital * equity[-1])
+        drawdown.append(min((equity / peak).min() - 1, 0) * 100)
+        streak.append(losses.max())
+
+    return np.array(final), np.array(drawdown), np.array(streak)
+
+
+def to_batch(growth):
+
+    n_paths, width = growth.shape
+    shape, position = mc._layout(width)
+
+    padded = np.zeros((n_paths, shape[0] * shape[1]), dtype=np.float32)
+    padded[:, :width] = np.log(growth)
+    logs = np.ascontiguousarray(padded.reshape(n_paths, shape[1], shape[0]).transpose(2, 1, 0))
+
+    work = {"peak": np.empty_like(logs), "last_gain": np.empty(logs.shape, dtype=position.dtype)}
+
+    return logs, position, work
+
+
+@pytest.mark.parametrize("width", [1, 7, 32, 33, 365, 2500])
+def test_path_stats_match_cumprod_reference(width):
+
+    rng = np.random.default_rng(width)
+    growth = np.where(rng.random((40, width)) < 0.4, 1 + rng.uniform(0, 0.03, (40, width)), 1 - rng.uniform(0, 0.02, (40, width)))
+    growth[:, rng.random(width) < 0.1] = 1.0
+
+    logs, position, work = to_batch(growth)
+    final, drawdown, streak = mc._path_stats(logs, position, 100000, work)
+    expected = reference_stats(growth, 100000)
+
+    np.testing.assert_allclose(final, expected[0], rtol=1e-5)
+    np.testing.assert_allclose(drawdown, expected[1], rtol=1e-5, atol=1e-5)
+    np.testing.assert_array_equal(streak, expected[2])
+
+
+def test_shuffle_keeps_final_capital_and_varies_the_path():
+
+    rng = np.random.default_rng(0)
+    trades = np.where(rng.random(200) < 0.4, rng.uniform(1, 3, 200), -1.0)
+
+    result = mc.run_monte_carlo(trades, 100000, 0.01, n_paths=3000, method="shuffle", seed=1)
+
+    np.testing.assert_allclose(result["final_capital"], 100000 * np.prod(1 + 0.01 * trades), rtol=1e-5)
+    assert np.ptp(result["max_drawdown"]) > 0
+    assert np.ptp(result["losing_streak"]) > 0
+
+
+def test_flat_and_ruinous_steps():
+
+    flat = mc.run_monte_carlo([0, 0, 0], n_paths=5, seed=0)
+    assert (flat["final_capital"] == 100000).all() and (flat["max_drawdown"] == 0).all()
+
+    ruin = mc.run_monte_carlo([-100], 100000, 0.01, n_paths=5, seed=0)
+    assert (ruin["final_capital"] == 0).all() and (ruin["max_drawdown"] == -100).all()
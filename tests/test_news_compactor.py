@@ -0,0 +1,28 @@
+import pytest
+from services.news_compactor import strip_boilerplate
+
+
+@pytest.mark.parametrize("sentence", [
+    "Copyright 2026 Example Media.",
+    "© Example Media Ltd.",
+    "Advertisement",
+    "We use cookies to improve your experience.",
+    "Subscribe to our newsletter for daily updates.",
+    "Also Read: Top gainers today.",
+    "Disclaimer: This is not investment advice.",
+    "Catch all the Business News and Updates on Example.",
+    "The views and recommendations made above are those of individual analysts.",
+])
+def test_strips_boilerplate(sentence):
+    assert strip_boilerplate(sentence) == ""
+
+
+@pytest.mark.parametrize("sentence", [
+    "The company settled a copyright dispute with its former partner.",
+    "Revenue from the cookies and biscuits segment rose 12%.",
+    "Advertisement revenue grew 8% in the quarter.",
+    "Retail investors can subscribe to the issue until Friday.",
+    "The board said the disclaimer in the prospectus was revised.",
+])
+def test_keeps_news_mentioning_the_same_words(sentence):
+    assert strip_boilerplate(sentence) == sentence
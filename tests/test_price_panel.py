@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from services.price_panel import PricePanel
+
+
+def make_panel():
+
+    dates = pd.bdate_range("2024-01-01", periods=10)
+    valid = np.ones((10, 3), dtype=bool)
+    valid[4, 1] = False
+
+    panel = PricePanel(dates, ["A", "B", "C"], valid)
+    panel["close"] = np.arange(30, dtype=float).reshape(10, 3)
+    panel["ema_200"] = panel["close"] * 0.5
+
+    return panel
+
+
+def test_slice_dates_is_inclusive_and_shares_memory():
+
+    panel = make_panel()
+    sliced = panel.slice_dates("2024-01-03", "2024-01-09")
+
+    assert list(sliced.dates) == list(pd.bdate_range("2024-01-03", "2024-01-09"))
+    assert np.shares_memory(sliced["close"], panel["close"])
+    assert np.shares_memory(sliced.valid, panel.valid)
+    assert sliced.column("close", "B").tolist() == panel["close"][2:7, 1].tolist()
+
+
+def test_slice_dates_between_sessions_and_open_ends():
+
+    panel = make_panel()
+
+    # 2024-01-06 is a Saturday
+    assert panel.slice_dates("2024-01-06").dates[0] == pd.Timestamp("2024-01-08")
+    assert panel.slice_dates(end="2024-01-06").dates[-1] == pd.Timestamp("2024-01-05")
+    assert len(panel.slice_dates()) == len(panel)
+
+
+def test_cast_narrows_only_the_named_fields():
+
+    panel = make_panel().cast(["ema_200"], np.float32)
+
+    assert panel["ema_200"].dtype == np.float32
+    assert panel["close"].dtype == np.float64
+    assert panel.column("ema_200", "C").tolist() == [v * 0.5 for v in range(2, 30, 3)]
@@ -0,0 +1,95 @@
+import pandas as pd
+import pytest
+import breakout_scanner
+import scan_orchestrator
+import vcp_scanner
+from benchmarks.synthetic import generate_symbol, generate_universe
+from services.db_writer import store_prices
+
+
+SYMBOLS = [f"SYN{i:02d}" for i in range(24)]
+YEARS = 11     # well past the breakout window, so full-history EMAs differ
+
+
+@pytest.fixture
+def universe(price_table, monkeypatch):
+
+    frames = generate_universe(SYMBOLS, years=YEARS, seed=3)
+    store_prices(frames)
+
+    nifty = generate_symbol("NIFTY 50", years=YEARS, seed=3)
+
+    def load_nifty(key, start_date, end_date):
+        return nifty.loc[start_date:end_date].copy()
+
+    monkeypatch.setattr(breakout_scanner, "load_stock_data", load_nifty)
+    monkeypatch.setattr(scan_orchestrator, "load_stock_data", load_nifty)
+
+    return frames
+
+
+def standalone_signals(scan_date, frames):
+
+    rows = []
+
+    # The standalone VCP scan skips symbols without a bar on the scan
+    # date; the orchestrator reads their last bar before it
+    for e in vcp_scanner.run_vcp_scan(scan_date, symbols=SYMBOLS):
+        rows.append({"strategy": "vcp", "symbol": e["symbol"], "signal": "entry",
+                     "entry": e["entry_price"], "stop": e["stop"], "target": e["target"], "qty": e["qty"]})
+
+    entries, exits = breakout_scanner.run_daily_scan(scan_date, symbols=SYMBOLS)
+    for e in entries:
+        rows.append({"strategy": "breakout", "symbol": e["symbol"], "signal": "entry",
+                     "entry": e["entry"], "stop": e["stop"], "target": float("nan"), "qty": e["qty"]})
+    for symbol in exits:
+        rows.append({"strategy": "breakout", "symbol": symbol, "signal": "exit"})
+
+    return _sorted(pd.DataFrame(rows, columns=scan_orchestrator.SIGNAL_COLUMNS))
+
+
+def _sorted(df):
+    return df.sort_values(["strategy", "symbol", "signal"], ignore_index=True)
+
+
+def test_combined_scan_matches_standalone_scanners(universe):
+
+    dates = sorted(set().union(*(df.index for df in universe.values())))
+    signals = 0
+
+    for date in dates[-40::8]:
+
+        scan_date = date.strftime("%Y-%m-%d")
+        on_date = {s for s, df in universe.items() if date in df.index}
+
+        combined = _sorted(scan_orchestrator.run_scan(symbols=SYMBOLS, scan_date=scan_date))
+        combined = combined[(combined["strategy"] != "vcp") | combined["symbol"].isin(on_date)]
+
+        expected = standalone_signals(scan_date, universe)
+
+        pd.testing.assert_frame_equal(combined.reset_index(drop=True), expected, check_dtype=False)
+        signals += len(expected)
+
+    assert signals > 0
+
+
+# Signals only flip near a threshold, so compare what breakout evaluates
+def test_breakout_reads_the_same_rows_as_the_standalone_scan(universe, monkeypatch):
+
+    seen = []
+    evaluate_latest = breakout_scanner.evaluate_latest
+
+    def recording(symbol, latest, market_ok):
+        seen.append((symbol, market_ok, {name: latest[name] for name in ["close", *breakout_scanner.BREAKOUT_INDICATORS]}))
+        return evaluate_latest(symbol, latest, market_ok)
+
+    monkeypatch.setattr(breakout_scanner, "evaluate_latest", recording)
+
+    scan_date = max(df.index[-1] for df in universe.values()).strftime("%Y-%m-%d")
+
+    breakout_scanner.run_daily_scan(scan_date, symbols=SYMBOLS)
+    standalone, seen[:] = list(seen), []
+    scan_orchestrator.run_scan(["breakout"], symbols=SYMBOLS, scan_date=scan_date)
+
+    assert len(standalone) == len(SYMBOLS)
+    assert seen == standalone
@@ -0,0 +1,48 @@
+import json
+import pytest
+from benchmarks.synthetic import generate_universe
+from scripts import update_daily_data
+from services.db_writer import store_prices
+from services.indicator_state import build_state, load_states, save_states
+
+
+SYMBOLS = ["INSYNC", "BEHIND", "AHEAD"]
+NEW_BARS = 10
+
+
+@pytest.fixture
+def history(price_table, monkeypatch):
+
+    frames = generate_universe(SYMBOLS, years=2, seed=5)
+    store_prices({s: df.iloc[:-NEW_BARS] for s, df in frames.items()})
+
+    def load_many(keys, start_date, end_date):
+        return {key: frames[key].loc[start_date:end_date] for key in keys}, []
+
+    monkeypatch.setattr(update_daily_data, "get_symbol_list", lambda: list(SYMBOLS))
+    monkeypatch.setattr(update_daily_data, "get_instrument_keys", lambda symbols: {s: s for s in symbols})
+    monkeypatch.setattr(update_daily_data, "load_many", load_many)
+
+    return frames
+
+
+def dump(state):
+    return json.dumps(state, sort_keys=True)
+
+
+def test_state_out_of_step_with_daily_prices_is_rebuilt(history):
+
+    # BEHIND missed the state save of an earlier run, AHEAD holds bars
+    # daily_prices never stored
+    save_states({
+        "INSYNC": build_state(history["INSYNC"].iloc[:-NEW_BARS]),
+        "BEHIND": build_state(history["BEHIND"].iloc[:-NEW_BARS - 5]),
+        "AHEAD": build_state(history["AHEAD"].iloc[:-NEW_BARS + 3]),
+    })
+
+    update_daily_data.main()
+
+    states = load_states()
+
+    for symbol in SYMBOLS:
+        assert dump(states[symbol]) == dump(build_state(history[symbol]))
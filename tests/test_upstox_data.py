@@ -0,0 +1,188 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import services.upstox_data as upstox
+from services import instrumentation
+
+
+CANDLES = [
+    ["2024-01-03T00:00:00+05:30", 101.0, 103.0, 100.0, 102.0, 1500, 0],
+    ["2024-01-02T00:00:00+05:30", 100.0, 102.0, 99.0, 101.0, 1200, 0],
+]
+
+
+# ==========================================
+# STUB UPSTOX SERVER
+# ==========================================
+#
+# Paths look like /<instrument>/day/<end>/<start>. Each instrument has a
+# script of responses, one per request; the last one repeats.
+#   "ok"    - 200 with CANDLES
+#   "empty" - 200 with no candles
+#   "drop"  - close the connection without answering
+#   int     - that status code (429 carries Retry-After: 0)
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+
+        key = self.path.split("/")[1]
+
+        with self.server.lock:
+            self.server.hits[key] = hits = self.server.hits.get(key, 0) + 1
+
+        script = self.server.scripts.get(key, ["ok"])
+        action = script[min(hits, len(script)) - 1]
+
+        if action == "drop":
+            self.close_connection = True
+            return
+
+        if action in ("ok", "empty"):
+            candles = CANDLES if action == "ok" else []
+            status, body = 200, {"status": "success", "data": {"candles": candles}}
+        else:
+            status, body = action, {"status": "error", "errors": [{"message": "stub"}]}
+
+        payload = json.dumps(body).encode()
+
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.lock = threading.Lock()
+    server.hits = {}
+    server.scripts = {}
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(upstox, "BASE_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(upstox, "BACKOFF_SECONDS", 0.001)
+    monkeypatch.setattr(upstox, "MAX_RETRIES", 3)
+    instrumentation.reset()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def counters():
+    return instrumentation.report()["counters"]
+
+
+# ==========================================
+# RETRIES
+# ==========================================
+
+def test_429_is_retried_until_success(stub):
+
+    stub.scripts["A"] = [429, 429, "ok"]
+
+    df = upstox.load_stock_data("A", "2024-01-01", "2024-06-30")
+
+    assert list(df["close"]) == [101.0, 102.0]
+    assert df.index.is_monotonic_increasing
+    assert stub.hits["A"] == 3
+    assert counters()["upstox.retries"] == 2
+
+
+def test_5xx_is_retried(stub):
+
+    stub.scripts["A"] = [503, "ok"]
+
+    assert upstox.load_stock_data("A", "2024-01-01", "2024-06-30") is not None
+    assert stub.hits["A"] == 2
+
+
+def test_client_error_is_not_retried(stub):
+
+    stub.scripts["A"] = [400]
+
+    assert upstox.load_stock_data("A", "2024-01-01", "2024-06-30") is None
+    assert stub.hits["A"] == 1
+    assert counters()["upstox.failed_chunks"] == 1
+
+
+def test_exhausted_connection_retries_cost_only_that_instrument(stub):
+
+    stub.scripts["BAD"] = ["drop"]
+
+    fetched, failed = upstox.load_many(["GOOD", "BAD", "ALSO_GOOD"], "2024-01-01", "2024-06-30")
+
+    assert failed == ["BAD"]
+    assert fetched["BAD"] is None
+    assert len(fetched["GOOD"]) == len(fetched["ALSO_GOOD"]) == 2
+    assert stub.hits["BAD"] == upstox.MAX_RETRIES + 1
+    assert counters()["upstox.failed_chunks"] == 1
+
+
+def test_failed_chunk_drops_the_whole_instrument(stub):
+
+    # Two year chunks; the second one fails, so no gappy series comes back
+    stub.scripts["GAP"] = ["ok", 400]
+
+    fetched, failed = upstox.load_many(["GAP", "FULL"], "2023-01-01", "2024-06-30", max_workers=1)
+
+    assert failed == ["GAP"]
+    assert fetched["GAP"] is None
+    assert fetched["FULL"] is not None
+    assert stub.hits["GAP"] == 2
+
+
+def test_exhausted_429_retries_are_reported(stub, capsys):
+
+    stub.scripts["LIMITED"] = [429]
+
+    fetched, failed = upstox.load_many(["LIMITED", "GOOD"], "2024-01-01", "2024-06-30")
+
+    assert failed == ["LIMITED"]
+    assert fetched["LIMITED"] is None
+    assert fetched["GOOD"] is not None
+    assert stub.hits["LIMITED"] == upstox.MAX_RETRIES + 1
+    assert "dropped 1 of 2 instruments after failed requests: LIMITED" in capsys.readouterr().out
+
+
+def test_empty_range_is_not_a_failure(stub):
+
+    stub.scripts["A"] = ["empty"]
+
+    fetched, failed = upstox.load_many(["A"], "2024-01-01", "2024-06-30")
+
+    assert failed == []
+    assert fetched["A"] is None
+
+
+# ==========================================
+# BACKOFF
+# ==========================================
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def test_retry_delay_honours_retry_after():
+    assert upstox._retry_delay(0, FakeResponse({"Retry-After": "3"})) == 3.0
+
+
+def test_retry_delay_backs_off_exponentially():
+
+    for attempt in range(4):
+        base = upstox.BACKOFF_SECONDS * 2 ** attempt
+        delay = upstox._retry_delay(attempt, FakeResponse({}))
+        assert base <= delay <= base * 1.25
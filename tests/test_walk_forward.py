@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from backtest import vcp_backtest
+from backtest.walk_forward import run_walk_forward
+from benchmarks.synthetic import generate_universe
+from services.db_writer import store_prices
+
+
+SYMBOLS = [f"SYN{i:02d}" for i in range(20)]
+GRID = {"atr_contraction": [0.8, 0.9], "volume_multiplier": [1.5]}
+
+
+@pytest.fixture
+def master(price_table, monkeypatch):
+
+    store_prices(generate_universe(SYMBOLS, years=4, seed=11))
+
+    monkeypatch.setattr(vcp_backtest, "START_DATE", "2015-01-01")
+    monkeypatch.setattr(vcp_backtest, "END_DATE", "2019-12-31")
+
+    return vcp_backtest.prepare_master(SYMBOLS)
+
+
+def walk(master, min_trades):
+    return run_walk_forward("vcp", GRID, master, train=300, test=150, min_trades=min_trades, max_workers=1)
+
+
+def test_windows_below_min_trades_are_skipped(master, capsys):
+
+    result = walk(master, min_trades=10 ** 6)
+    windows = result["windows"]
+
+    assert len(windows) > 1
+    assert not windows["selected"].any()
+    assert windows["atr_contraction"].isna().all()
+    assert (windows["test_trades"] == 0).all()
+    assert result["summary"]["trades"] == 0
+    assert (result["equity"] == vcp_backtest.INITIAL_CAPITAL).all()
+    assert len(result["equity"]) == len(master.dates) - 300
+    assert capsys.readouterr().out.count("WARNING: no combination reached") == len(windows)
+
+
+def test_windows_with_a_valid_score_trade(master):
+
+    result = walk(master, min_trades=0)
+    windows = result["windows"]
+
+    assert windows["selected"].all()
+    assert windows["atr_contraction"].isin(GRID["atr_contraction"]).all()
+    assert result["summary"]["trades"] == windows["test_trades"].sum() > 0
+    assert np.isfinite(windows["train_total_return"]).all()
@@ -1,8 +1,9 @@
 import pandas as pd
-import numpy as np
-from sqlalchemy import text
-from config.database import engine
+from services.db_data_loader import load_universe_data
 from services.instrument_mapper import get_symbol_list
+from services.indicators import add_indicators
+from services.indicator_state import load_states
+from services.instrumentation import timed
 
 
 CAPITAL = 100000
@@ -10,57 +11,19 @@ RISK_PER_TRADE = 0.01
 
 SCAN_DATE = None  # Set manually like "2026-02-12" or leave None for latest
 
-
-# ==========================================
-# LOAD STOCK DATA FROM DB
-# ==========================================
-
-def load_stock_data(symbol):
-
-    query = """
-        SELECT date, open, high, low, close, volume
-        FROM daily_prices
-        WHERE symbol = :symbol
-        ORDER BY date
-    """
-
-    with engine.connect() as conn:
-        df = pd.read_sql(text(query), conn, params={"symbol": symbol})
-
-    if df.empty:
-        return None
-
-    df["date"] = pd.to_datetime(df["date"])
-    df.set_index("date", inplace=True)
-
-    return df
+VCP_INDICATORS = ["ema_200", "ema_50", "hh_20", "ll_10", "vol_ma_20", "atr_14", "atr_mean_50"]
 
 
 # ==========================================
 # APPLY VCP LOGIC
 # ==========================================
 
-def apply_vcp_logic(df):
+@timed("scan.vcp_apply_logic")
+def apply_vcp_logic(df, symbol=None):
 
     df = df.copy()
 
-    df["ema_200"] = df["close"].ewm(span=200).mean()
-    df["ema_50"] = df["close"].ewm(span=50).mean()
-
-    df["hh_20"] = df["high"].rolling(20).max().shift(1)
-    df["ll_10"] = df["low"].rolling(10).min().shift(1)
-    df["vol_ma_20"] = df["volume"].rolling(20).mean()
-
-    # ATR
-    df["tr"] = np.maximum(
-        df["high"] - df["low"],
-        np.maximum(
-            abs(df["high"] - df["close"].shift(1)),
-            abs(df["low"] - df["close"].shift(1))
-        )
-    )
-    df["atr_14"] = df["tr"].rolling(14).mean()
-    df["atr_mean_50"] = df["atr_14"].rolling(50).mean()
+    add_indicators(df, VCP_INDICATORS, symbol=symbol)
 
     trend = (
         (df["close"] > df["ema_200"]) &
@@ -86,63 +49,153 @@ def apply_vcp_logic(df):
     return df
 
 
+# Scalar version of the rules above for a single indicator-state snapshot
+def apply_vcp_state(latest):
+
+    latest = dict(latest)
+
+    trend = (
+        latest["close"] > latest["ema_200"] and
+        latest["ema_50"] > latest["ema_200"] and
+        latest["ema_50"] > latest["ema_50_shift_5"]
+    )
+
+    contraction = latest["atr_14"] < latest["atr_mean_50"] * 0.8
+
+    breakout = (
+        latest["close"] > latest["hh_20"] and
+        latest["volume"] > 1.5 * latest["vol_ma_20"]
+    )
+
+    latest["stop"] = latest["ll_10"]
+    latest["risk"] = latest["close"] - latest["stop"]
+    latest["target"] = latest["close"] + 2 * latest["risk"]
+
+    latest["entry"] = trend and contraction and breakout and not latest["risk"] <= 0
+
+    return latest
+
+
 # ==========================================
 # SCREENER
 # ==========================================
 
-def run_vcp_scan():
+def size_entry(symbol, latest):
+
+    if not latest["entry"]:
+        return None
+
+    entry_price = latest["close"]
+    stop = latest["stop"]
+    risk = entry_price - stop
+
+    if risk <= 0:
+        return None
+
+    risk_amount = CAPITAL * RISK_PER_TRADE
+    qty = int(risk_amount / risk)
+
+    if qty <= 0:
+        return None
+
+    return {
+        "symbol": symbol,
+        "entry_price": round(entry_price, 2),
+        "stop": round(stop, 2),
+        "target": round(latest["target"], 2),
+        "qty": qty
+    }
 
-    symbols = get_symbol_list()
+
+def run_vcp_scan(scan_date=None, symbols=None):
+
+    scan_date = scan_date or SCAN_DATE
+
+    if symbols is None:
+        symbols = get_symbol_list()
+    universe = load_universe_data(symbols)
 
     today_entries = []
 
     for symbol in symbols:
 
-        df = load_stock_data(symbol)
+        df = universe.get(symbol)
 
         if df is None or len(df) < 300:
             continue
 
-        df = apply_vcp_logic(df)
-        if SCAN_DATE:
-            if pd.to_datetime(SCAN_DATE) not in df.index:
+        df = apply_vcp_logic(df, symbol=symbol)
+        if scan_date:
+            if pd.to_datetime(scan_date) not in df.index:
                 continue
-            latest = df.loc[pd.to_datetime(SCAN_DATE)]
+            latest = df.loc[pd.to_datetime(scan_date)]
         else:
             latest = df.iloc[-1]
-            
-        if not latest["entry"]:
-            continue
 
-        entry_price = latest["close"]
-        stop = latest["stop"]
-        risk = entry_price - stop
+        entry = size_entry(symbol, latest)
+        if entry:
+            today_entries.append(entry)
 
-        if risk <= 0:
-            continue
+    return today_entries
+
+
+# Signals the scanner would have shown on every session in a date
+# range, from one indicator pass per symbol
+def run_vcp_replay(start_date, end_date=None, symbols=None):
+
+    if symbols is None:
+        symbols = get_symbol_list()
+    universe = load_universe_data(symbols)
 
-        risk_amount = CAPITAL * RISK_PER_TRADE
-        qty = int(risk_amount / risk)
+    start = pd.to_datetime(start_date)
+    end = pd.to_datetime(end_date) if end_date else None
 
-        if qty <= 0:
+    entries = []
+
+    for symbol in symbols:
+
+        df = universe.get(symbol)
+
+        if df is None or len(df) < 300:
             continue
 
-        today_entries.append({
-            "symbol": symbol,
-            "entry_price": round(entry_price, 2),
-            "stop": round(stop, 2),
-            "target": round(latest["target"], 2),
-            "qty": qty
-        })
+        df = apply_vcp_logic(df, symbol=symbol)
+        window = df.loc[start:end]
 
-    return today_entries
+        for date, latest in window[window["entry"]].iterrows():
+            entry = size_entry(symbol, latest)
+            if entry:
+                entries.append({"date": date.strftime("%Y-%m-%d"), **entry})
 
+    # Stable sort keeps the symbol order within each date
+    entries.sort(key=lambda e: e["date"])
 
-# ==========================================
+    return entries
 
-if __name__ == "__main__":
 
-    entries = run_vcp_scan()
+# Latest-bar scan from the indicator state kept by scripts/update_daily_data.py
+def run_vcp_state_scan(states=None):
+
+    if states is None:
+        states = load_states()
+
+    today_entries = []
+
+    for symbol in get_symbol_list():
+
+        state = states.get(symbol)
+
+        if state is None or state["bars"] < 300:
+            continue
+
+        entry = size_entry(symbol, apply_vcp_state(state["latest"]))
+        if entry:
+            today_entries.append(entry)
+
+    return today_entries
+
+
+def print_entries(entries):
 
     print("\n===== VCP ENTRY SIGNALS =====")
 
@@ -151,6 +204,15 @@ if __name__ == "__main__":
     else:
         for e in entries:
             print(
+                (f"{e['date']} | " if "date" in e else "") +
                 f"{e['symbol']} | Entry: {e['entry_price']} | "
                 f"Stop: {e['stop']} | Target: {e['target']} | Qty: {e['qty']}"
             )
+
+
+# ==========================================
+# Options (--date, --state, --replay) live in scan.py
+
+if __name__ == "__main__":
+
+    print_entries(run_vcp_scan())